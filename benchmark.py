@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Runs the slic tools over a tree (usually a synthetic one; see synth_tree.py)
+# and measures them, for the bench script. Each tool is a stage:
+#
+#   slic            slic --stats <tree>
+#   slic-details    slic -D --stats <tree>, whose output the rest read
+#   flic            flic --input <output> --template license.txt
+#   inferno         inferno -i <output>
+#   license_stats   license_stats <output>
+#
+# For each stage we record the wall-clock time, files per second (over all
+# the files in the tree), peak memory use (RSS, of the process and any
+# workers it waited for) and exit status; for slic, also the times from its
+# --stats report (time spent waiting for I/O, computing, etc.).
+#
+# A run's results are a record (a dict, as JSON) which also says what was
+# run, where, and on which tree. Records are appended to a history file, one
+# line of JSON each; a record can also be saved as a baseline, and later
+# runs compared with it, to catch regressions.
+###############################################################################
+import os
+import re
+import sys
+import json
+import time
+import platform
+import subprocess
+
+STAGES = ['slic', 'slic-details', 'flic', 'inferno', 'license_stats']
+
+# Measures compared with the baseline; for both, more is worse
+MEASURES = ['seconds', 'max_rss_kb']
+
+# Default allowance for noise: a measure regresses if it is more than this
+# fraction worse than the baseline
+DEFAULT_TOLERANCE = 0.1
+
+# Changes in time smaller than this (in seconds) are noise, however large a
+# fraction of a quick stage they are
+MIN_TIME_CHANGE = 0.25
+
+_SLICDIR = os.path.dirname(os.path.abspath(__file__))
+
+# A line of slic --stats: "Computing: 12.49s"
+_stats_re = re.compile(r"^([A-Z][\w /]*): ([\d.]+)s", re.MULTILINE)
+
+def run(args, cwd=None, stdout=None, stderr=None):
+    """Runs the command "args" and returns a dict of its 'seconds',
+    'max_rss_kb' (peak resident memory) and 'status' (exit status, or minus
+    the signal which killed it).
+    """
+    start = time.time()
+    process = subprocess.Popen(args, cwd=cwd, stdout=stdout, stderr=stderr)
+    # wait4 gives the resources used by just this process (and the children
+    # it waited for)
+    (pid, status, usage) = os.wait4(process.pid, 0)
+    elapsed = time.time() - start
+
+    if os.WIFEXITED(status):
+        process.returncode = os.WEXITSTATUS(status)
+    else:
+        process.returncode = -os.WTERMSIG(status)
+
+    # ru_maxrss is in kilobytes on Linux, bytes on Mac OS X
+    max_rss = usage.ru_maxrss
+    if sys.platform == 'darwin':
+        max_rss //= 1024
+
+    return {'seconds': round(elapsed, 3), 'max_rss_kb': max_rss,
+            'status': process.returncode}
+
+def parse_stats(text):
+    """Returns the times in slic --stats output, as a dict by name"""
+    return dict((name, float(seconds))
+                for (name, seconds) in _stats_re.findall(text))
+
+def _revision():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                           cwd=_SLICDIR,
+                                           stderr=devnull).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _commands(tree, details, jobs):
+    # The command for each stage; "details" is where slic -D's output goes
+    python = sys.executable
+    tool = lambda name: os.path.join(_SLICDIR, name)
+    slic = [python, tool("slic"), "--stats"]
+    if jobs > 1:
+        slic.append("--jobs=%i" % jobs)
+
+    return {
+        'slic': slic + [tree],
+        'slic-details': slic + ["-D", tree],
+        'flic': [python, tool("flic"), "--input", details,
+                 "--template", "license.txt"],
+        'inferno': [python, tool("inferno"), "-i", details],
+        'license_stats': [python, tool("license_stats"), details],
+    }
+
+def run_stages(tree, manifest, workdir, stages=STAGES, jobs=1):
+    """Runs each of "stages" over "tree", whose manifest (see synth_tree)
+    is "manifest", in the directory "workdir" (where their output and logs
+    go). Returns the record of the run.
+    """
+    details = os.path.join(workdir, "slic-details.out")
+    commands = _commands(os.path.abspath(tree), details, jobs)
+    results = {}
+
+    # In order, whichever order they were given in
+    for stage in [stage for stage in STAGES if stage in stages]:
+        output = os.path.join(workdir, "%s.out" % stage)
+        errors = os.path.join(workdir, "%s.err" % stage)
+        with open(output, 'w') as stdout:
+            with open(errors, 'w') as stderr:
+                result = run(commands[stage], workdir, stdout, stderr)
+
+        seconds = result['seconds']
+        result['files_per_sec'] = round(manifest['files'] / seconds, 1) \
+                                  if seconds else None
+
+        with open(errors, 'r') as stderr:
+            text = stderr.read()
+        if stage.startswith('slic'):
+            result['steps'] = parse_stats(text)
+        if result['status'] != 0:
+            # The last line is usually the one which says what went wrong
+            lines = text.strip().splitlines()
+            result['error'] = lines[-1] if lines else ""
+
+        results[stage] = result
+
+    return {
+        'date': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'revision': _revision(),
+        'python': platform.python_version(),
+        'host': platform.node(),
+        'jobs': jobs,
+        'tree': manifest,
+        'stages': results,
+    }
+
+def append_history(record, filename):
+    """Add a run's record to the history file "filename" """
+    with open(filename, 'a') as history:
+        history.write(json.dumps(record, sort_keys=True) + "\n")
+
+def load_history(filename):
+    """Returns the records in the history file "filename", oldest first"""
+    with open(filename, 'r') as history:
+        return [json.loads(line) for line in history if line.strip()]
+
+def save_baseline(record, filename):
+    with open(filename, 'w') as baseline:
+        json.dump(record, baseline, indent=1, sort_keys=True)
+
+def load_baseline(filename):
+    with open(filename, 'r') as baseline:
+        return json.load(baseline)
+
+def same_tree(record, baseline):
+    """Whether two runs were over the same tree (and so can be compared)"""
+    keys = ('version', 'files', 'seed')
+    return [record['tree'].get(key) for key in keys] == \
+           [baseline['tree'].get(key) for key in keys]
+
+def compare(record, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compare a run with a baseline. Returns a list of (stage, measure,
+    old, new, regressed) for each measure of each stage which succeeded in
+    both. A stage which succeeded in the baseline but fails now is a
+    regression, with measure 'status'.
+    """
+    comparison = []
+    for stage in STAGES:
+        new = record['stages'].get(stage)
+        old = baseline['stages'].get(stage)
+        if new is None or old is None or old['status']:
+            continue
+
+        if new['status']:
+            comparison.append((stage, 'status', old['status'], new['status'],
+                               True))
+            continue
+
+        for measure in MEASURES:
+            regressed = new[measure] > old[measure] * (1 + tolerance)
+            if measure == 'seconds' and \
+               new[measure] - old[measure] < MIN_TIME_CHANGE:
+                regressed = False
+            comparison.append((stage, measure, old[measure], new[measure],
+                               regressed))
+
+    return comparison
+
+def to_string(record, comparison=None):
+    """A table of the results of a run, and how they compare with a
+    baseline, if "comparison" (from compare()) is given.
+    """
+    tree = record['tree']
+    lines = ["%i files (seed %i), %i job(s)" % (tree['files'], tree['seed'],
+                                               record['jobs']),
+             "%-14s  %9s  %9s  %11s  %s" % ("Stage", "Seconds", "Files/s",
+                                           "Max RSS kB", "")]
+
+    changes = {}
+    for (stage, measure, old, new, regressed) in comparison or []:
+        if measure == 'status':
+            change = "now fails"
+        elif old:
+            change = "%s %+.0f%%" % (measure, 100.0 * (new - old) / old)
+        else:
+            change = "%s new" % measure
+        if regressed:
+            change += " REGRESSED"
+        changes.setdefault(stage, []).append(change)
+
+    for stage in STAGES:
+        result = record['stages'].get(stage)
+        if result is None:
+            continue
+
+        if result['status']:
+            lines.append("%-14s  failed (%i): %s  %s" %
+                         (stage, result['status'], result.get('error', ""),
+                          ", ".join(changes.get(stage, []))))
+            continue
+
+        lines.append("%-14s  %9.2f  %9.1f  %11i  %s" %
+                     (stage, result['seconds'], result['files_per_sec'] or 0,
+                      result['max_rss_kb'],
+                      ", ".join(changes.get(stage, []))))
+        for (step, seconds) in sorted(result.get('steps', {}).iteritems()):
+            lines.append("    %-24s %9.2f" % (step, seconds))
+
+    return "\n".join(lines)
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Finds the comments in a file, for a given set of comment delimiter sets
+# (as returned by config.get_delims), and strips the comment characters off
+# them.
+#
+# A delimiter set is either [start, continuation, end], for block comments
+# like /* * */, or [start], for line comments like #. A block comment runs
+# from a line starting with "start" to the first line containing "end"; a
+# run of one-line block comments counts as one comment. A line comment is a
+# run of lines starting with "start", or blank. (The special set [''] means
+# there are no comment characters, and the whole file is one comment.)
+#
+# The comments for all the delimiter sets are found in a single pass over
+# the lines of the file. A lexer is compiled once for each different list of
+# delimiter sets, and reused; use get_lexer().
+###############################################################################
+import re
+
+# What \s means in our regexps
+_WHITESPACE = " \t\n\r\f\v"
+
+# Number of compiled lexers kept
+MAX_CACHED_LEXERS = 100
+
+_lexers = {}
+
+def get_lexer(delim_sets):
+    """Returns the CommentLexer for the list of delimiter sets"""
+    key = tuple(tuple(delims) for delims in delim_sets)
+    lexer = _lexers.get(key)
+
+    if lexer is None:
+        lexer = CommentLexer(delim_sets)
+        if len(_lexers) >= MAX_CACHED_LEXERS:
+            _lexers.clear()
+        _lexers[key] = lexer
+
+    return lexer
+
+
+class _Delims(object):
+    """A delimiter set, and the regexps for stripping its comment chars"""
+    def __init__(self, delims):
+        self.delims = delims
+        self.start = delims[0]
+        self.block = len(delims) == 3
+
+        if self.block:
+            self.end = delims[2]
+            cont = delims[1]
+            self.suffix_re = re.compile(r"\s*%s" % re.escape(self.end))
+            # If every line is its own comment, the start is stripped off
+            # every line; see strip()
+            self.start_cont_re = re.compile(r"^\s*%s+\s?" %
+                                            re.escape(self.start))
+        elif len(delims) == 1:
+            cont = delims[0]
+            self.suffix_re = None
+        else:
+            raise ValueError("Invalid delimiter length in delims: %s" %
+                             delims)
+
+        self.prefix_re = re.compile(r"^\s*%s\s?" % re.escape(self.start))
+        # Allow multiple occurrences of cont char or last cont char
+        self.cont_re = re.compile(r"^\s*%s+\s?" % re.escape(cont))
+
+
+# Strip trailing whitespace and cruft (also */ terminators from comments
+# where each line is a single "multi-line" comment)
+_trailing_re = re.compile(r"[\*\/#\s]*$")
+
+# States while looking for a delimiter set's comments
+_SEEK, _IN, _RUN = range(3)
+
+class CommentLexer(object):
+    def __init__(self, delim_sets):
+        self._index = [index for (index, delims) in enumerate(delim_sets)
+                       if delims[0] != '']
+        self._sets = [_Delims(delim_sets[index]) for index in self._index]
+        self._by_index = dict(zip(self._index, self._sets))
+        self._count = len(delim_sets)
+
+    def find_comments(self, lines):
+        """Returns, for each delimiter set in turn, the list of comments in
+        "lines", as (first line, line after the last) pairs. The list for the
+        special delimiter set [''] is empty.
+        """
+        comments = [[] for i in range(self._count)]
+        found = [comments[index] for index in self._index]
+
+        # For each delimiter set: state, and first and last lines of the
+        # comment in progress
+        states = [_SEEK] * len(self._sets)
+        starts = [0] * len(self._sets)
+        ends = [0] * len(self._sets)
+        numbered = list(enumerate(self._sets))
+
+        for i, line in enumerate(lines):
+            stripped = line.lstrip(_WHITESPACE)
+
+            for n, delims in numbered:
+                state = states[n]
+
+                if state == _RUN:
+                    # After a one-line block comment; are there more?
+                    if stripped.startswith(delims.start) and \
+                       delims.end in line:
+                        ends[n] = i
+                        continue
+
+                    found[n].append((starts[n], ends[n] + 1))
+                    state = states[n] = _SEEK
+                elif state == _IN:
+                    if delims.block:
+                        if delims.end in line:
+                            found[n].append((starts[n], i + 1))
+                            states[n] = _SEEK
+                        continue
+
+                    if not stripped or stripped.startswith(delims.start):
+                        continue
+
+                    found[n].append((starts[n], i))
+                    state = states[n] = _SEEK
+
+                # _SEEK
+                if stripped.startswith(delims.start):
+                    starts[n] = i
+                    if delims.block and delims.end in line:
+                        ends[n] = i
+                        states[n] = _RUN
+                    else:
+                        states[n] = _IN
+
+        # Comments still open at the end of the file
+        for n in range(len(self._sets)):
+            if states[n] == _RUN:
+                found[n].append((starts[n], ends[n] + 1))
+            elif states[n] == _IN:
+                found[n].append((starts[n], len(lines)))
+
+        return comments
+
+    def strip(self, lines, index, start, end):
+        """Returns lines[start:end], a comment found using delimiter set
+        number "index", with all the starting (and ending, if appropriate)
+        comment chars removed, to leave just the text.
+        """
+        return self.strip_comment(lines[start:end], self._by_index[index])
+
+    def strip_comment(self, comment, delims):
+        """Strip the comment chars from the list of lines "comment" in place,
+        and return it. "delims" is a _Delims.
+        """
+        # Strip prefix
+        comment[0] = delims.prefix_re.sub("", comment[0])
+        cont_re = delims.cont_re
+
+        # Strip suffix
+        if delims.suffix_re:
+            comment[-1] = delims.suffix_re.sub("", comment[-1])
+
+            # If this is a multi-line comment but the suffix appears on the
+            # first line, it's of the form where every line is its own
+            # mini-comment. (This happens most often with /* */.) If so,
+            # strip the "start" off all lines rather than the "cont".
+            if delims.suffix_re.search(comment[0]) and len(comment) > 1:
+                cont_re = delims.start_cont_re
+
+        for i in range(1, len(comment)):
+            # Strip continuation char
+            comment[i] = cont_re.sub("", comment[i])
+            # Strip trailing whitespace and cruft
+            comment[i] = _trailing_re.sub("", comment[i])
+
+        return comment
@@ -9,12 +9,12 @@
 
 import re
 import os
-import sys
 import ConfigParser
 
-import logging
-logging.basicConfig(filename="slic.log")
-log = logging.getLogger("slic")
+import scan_profile
+import tracing
+
+log = tracing.get_logger()
 
 config = ConfigParser.ConfigParser(allow_no_value=True)
 # Make it case-sensitive
@@ -23,8 +23,141 @@ config.optionxform = str
 # This is sadly necessary for nosetests to pass; an ini file is required
 config.read(['/usr/src/relic/slic.ini'])
 
+# Sections looked up for every file, which compile_tables() turns into
+# tables
+_DELIM_SECTIONS = ["filename_to_comment", "ext_to_comment",
+                   "noextname_to_comment"]
+
+# Delimiters for files with a shebang line
+_SHEBANG_DELIMS = (('#',),)
+_NODE_DELIMS = (('/*', '*', '*/'),)
+
+# Number of filenames whose delimiters are remembered
+MAX_MEMOIZED_NAMES = 10000
+
+class ConfigError(Exception):
+    pass
+
+
+class _Tables(object):
+    """The parts of the config used for every file, parsed and checked"""
+    def __init__(self):
+        self.strip_exts = frozenset(_options("strip_exts"))
+        self.delims = {}
+        errors = []
+
+        for section in _DELIM_SECTIONS:
+            table = {}
+            for option in _options(section):
+                value = config.get(section, option)
+                if value is None:
+                    continue
+
+                try:
+                    table[option] = _parse_delims(value)
+                except ValueError, ex:
+                    errors.append("[%s] %s: %s" % (section, option, ex))
+
+            self.delims[section] = table
+
+        self.profiles = {}
+        for option in _options("scan_profiles"):
+            try:
+                value = config.get("scan_profiles", option)
+                if value is None:
+                    raise ValueError("no profile given")
+                self.profiles[option] = scan_profile.ScanProfile.parse(value)
+            except ValueError, ex:
+                errors.append("[scan_profiles] %s: %s" % (option, ex))
+
+        if errors:
+            raise ConfigError("Error in config:\n  " + "\n  ".join(errors))
+
+        # Delimiters and profiles by filename, filled in as files are looked
+        # up
+        self.by_name = {}
+        self.profiles_by_name = {}
+
+    def get_delims(self, filename):
+        delims = self.by_name.get(filename, _UNKNOWN)
+        if delims is _UNKNOWN:
+            delims = self._lookup(filename)
+            if len(self.by_name) >= MAX_MEMOIZED_NAMES:
+                self.by_name.clear()
+            self.by_name[filename] = delims
+
+        return delims
+
+    def get_scan_profile(self, filename):
+        profile = self.profiles_by_name.get(filename)
+        if profile is None:
+            profile = self.profiles.get(filename)
+            if profile is None:
+                profile = self.profiles.get(self._split(filename)[2],
+                                            scan_profile.DEFAULT)
+            if len(self.profiles_by_name) >= MAX_MEMOIZED_NAMES:
+                self.profiles_by_name.clear()
+            self.profiles_by_name[filename] = profile
+
+        return profile
+
+    def _split(self, filename):
+        """Returns (filename, name without extension, extension), once any
+        extension in strip_exts has been removed.
+        """
+        noext, ext = os.path.splitext(filename)
+
+        # Strip extensions which hide the real extension. E.g. "foo.bar.in"
+        # is generally a precursor for file "foo.bar" and uses the same
+        # comment char. So we remove the .in and then look again.
+        if ext in self.strip_exts:
+            filename = noext
+            noext, ext = os.path.splitext(noext)
+
+        return filename, noext, ext
+
+    def _lookup(self, filename):
+        filename, noext, ext = self._split(filename)
+        if tracing.enabled:
+            tracing.trace("Filename: %s; Ext: %s", filename, ext)
+
+        # First see if we have a special setting for this filename, then try
+        # the file extension, then the basename
+        delims = self.delims["filename_to_comment"].get(filename)
+        if delims is None:
+            delims = self.delims["ext_to_comment"].get(ext)
+        if delims is None:
+            delims = self.delims["noextname_to_comment"].get(noext)
+
+        return delims
+
+
+_UNKNOWN = object()
+_tables = None
+
 def read(files):
+    global _tables
     config.read(files)
+    _tables = None
+
+def compile_tables():
+    """Parse and check the parts of the config used for every file, ready for
+    looking them up. Raises ConfigError if any are bad. If this isn't called
+    after the config files are read, it happens on the first lookup.
+    """
+    global _tables
+    _tables = _Tables()
+
+def _get_tables():
+    if _tables is None:
+        compile_tables()
+    return _tables
+
+def _options(section):
+    if not config.has_section(section):
+        return []
+
+    return config.options(section)
 
 def get_option(section, option):
     retval = None
@@ -38,78 +171,73 @@ def get_option(section, option):
 def has_option(section, option):
     return config.has_option(section, option)
 
+def get_options(section):
+    """The options in a section, in order; an empty list if there's no such
+    section.
+    """
+    return _options(section)
+
 # Returns comment delimiters for this filename, or None if we can't work it
-# out
-def get_delims(path):
-    delims = None
-
-    # There are some extensions which need stripping off to show the 'real'
-    # extension
-    filename = os.path.basename(path)
-    noext, ext = os.path.splitext(filename)
-
-    log.debug("noext: %s; Ext: %s" % (noext, ext))
-    
-    # Strip extensions which hide the real extension. E.g. "foo.bar.in" is
-    # generally a precursor for file "foo.bar" and uses the same comment char.
-    # So we remove the .in and then look again.
-    if config.has_option("strip_exts", ext):
-        filename = noext
-        noext, ext = os.path.splitext(noext)
-
-    log.debug("Filename: %s; Ext: %s" % (filename, ext))
-    
-    # First see if we have a special setting for this filename
-    delims = get_option("filename_to_comment", filename)
-
-    # Then try the file extension
-    if delims is None:
-        delims = get_option("ext_to_comment", ext)
+# out. If the start of the file's content is given, it's used instead of
+# reading the file when looking for a shebang line.
+def get_delims(path, content=None):
+    delims = _get_tables().get_delims(os.path.basename(path))
 
-    # Then try the basename
-    if delims is None:
-        delims = get_option("noextname_to_comment", noext)
-    
     if delims is None:
         # try to use the shebang line, if any
-        fin = open(path, 'r')
-        firstline = fin.readline()
-        fin.close()
+        if content is not None:
+            firstline = content.split("\n", 1)[0]
+        else:
+            fin = open(path, 'r')
+            firstline = fin.readline()
+            fin.close()
         # Almost all #! file types use # as the comment character
         if firstline.startswith("#!"):
             if re.search("env node", firstline):
-                delims = '/*, *, */'
+                delims = _NODE_DELIMS
             else:
-                delims = '#'
-    
-    if delims is not None:
-        # Convert from string to Python structure - split on "|", then on ","
-        # A delim is an array of exactly 1 or 3 members
-        delims = re.split(r'\s*\|\s*', delims)
-        for index, delim in enumerate(delims):
-            if re.search(',', delim):
-                delims[index] = re.split(r',\s*', delim)
-                if len(delims[index]) != 3:
-                    print "Error in delims for file %s" % filename
-                    sys.exit(2)
-            # "No delimiter" is encoded by special value ""
-            elif delim == '""':
-                delims[index] = ['']
-            else:
-                delims[index] = [delim]
+                delims = _SHEBANG_DELIMS
+
+    return _as_lists(delims)
+
+# Returns the ScanProfile for this filename
+def get_scan_profile(path):
+    return _get_tables().get_scan_profile(os.path.basename(path))
+
+# Returns comment delimiters for this filename if they can be worked out
+# from the name alone, without looking at the content; otherwise None.
+def get_delims_by_name(path):
+    return _as_lists(_get_tables().get_delims(os.path.basename(path)))
+
+def _as_lists(delims):
+    # The tables are shared, so callers get their own copy
+    if delims is None:
+        return None
+
+    delims = [list(delim) for delim in delims]
+    if tracing.enabled:
+        tracing.trace("Delims: %r", delims)
 
-    log.debug("Delims: %r" % delims)
-    
     return delims
 
+def _parse_delims(delims):
+    # Convert from string to Python structure - split on "|", then on ","
+    # A delim is an array of exactly 1 or 3 members
+    delims = re.split(r'\s*\|\s*', delims)
+    for index, delim in enumerate(delims):
+        if re.search(',', delim):
+            delims[index] = tuple(re.split(r',\s*', delim))
+            if len(delims[index]) != 3:
+                raise ValueError("'%s' should have 3 parts, not %i" %
+                                 (delim, len(delims[index])))
+        # "No delimiter" is encoded by special value ""
+        elif delim == '""':
+            delims[index] = ('',)
+        else:
+            delims[index] = (delim,)
+
+    return tuple(delims)
+
 
 def _get_ext(filename):
-    splitname = os.path.splitext(filename)
-    
-    # Strip extensions which hide the real extension. E.g. "foo.bar.in" is
-    # generally a precursor for file "foo.bar" and uses the same comment char.
-    # So we remove the .in and then look again.
-    if config.has_option("strip_exts", splitname[1]):
-        splitname = os.path.splitext(splitname[0])
-
-    return splitname[1]
+    return _get_tables()._split(filename)[2]
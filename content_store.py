@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# A store of slic results keyed on file content, so that identical files
+# (e.g. multiple vendored copies of the same library) are only scanned once.
+#
+# The key is made from a hash of the bytes the detector looks at, plus the
+# comment delimiters used to look at them - the two things which determine
+# the result. The hash is computed the same way git computes blob IDs, so for
+# any file smaller than detector.MAX_SCAN_BYTES it *is* the file's git blob
+# ID. (When the whole of a blob is identified by its ID, the file's
+# ScanProfile, if it's not the default, is part of the key too.)
+#
+# A file which is the same inode (with the same size and modification time)
+# as one already seen in this run, i.e. a hard link or a symlink to it, is
+# given the same key without being hashed again, if its name gives it the same
+# delimiters and ScanProfile.
+#
+# With --jobs, files on disk are looked up by the worker processes, each in
+# its own copy of the store as it was when the scan started; new results are
+# only added to the main process's copy. So --dedup only saves scanning
+# content which was in the saved --store already, not copies of the same
+# content found in the same run. (Blobs read from git are looked up in the
+# main process as they're read, so a copy is only scanned again if it's read
+# before the result for the first one is back.)
+#
+# Unlike the ScanCache, the store doesn't depend on paths or on the rest of
+# the configuration (other than the scan profiles), so the file it is saved in
+# can be copied between machines and trees and used to seed new scans.
+###############################################################################
+import os
+import json
+import copy
+import hashlib
+
+import config
+from scan_cache import make_fingerprint
+import tracing
+
+log = tracing.get_logger()
+
+def blob_id(content):
+    """The git blob ID of the given bytes"""
+    return hashlib.sha1("blob %i\0%s" % (len(content), content)).hexdigest()
+
+def make_key(content_id, delims):
+    """Combine an ID for the scanned content with the delimiters which will be
+    used to scan it.
+    """
+    return content_id + " " + json.dumps(delims)
+
+def scanned_id(content, tail=None):
+    """An ID for the bytes the detector looks at: the start of a file, and
+    perhaps its end.
+    """
+    if tail is None:
+        return blob_id(content)
+
+    return blob_id(content) + "+" + blob_id(tail)
+
+def blob_key(oid, path, delims):
+    """The key for the git blob "oid", which is to be scanned as "path" """
+    profile = str(config.get_scan_profile(path))
+    if profile:
+        oid += "@" + profile
+
+    return make_key(oid, delims)
+
+def content_key(filename, content):
+    """The key for a file with the given (raw) content, or None if it can't be
+    scanned.
+    """
+    (content, tail) = config.get_scan_profile(filename).select(content)
+    delims = config.get_delims(filename, content)
+    if not delims:
+        return None
+
+    return make_key(scanned_id(content, tail), delims)
+
+
+class ContentStore(object):
+    def __init__(self, filename, params):
+        """Open the store saved in "filename", if any, provided it's valid
+        for a scan with the given Detector params. If "filename" is None,
+        the store only lasts for this run.
+        """
+        self._filename = filename
+        self._fingerprint = make_fingerprint(params, include_config=False)
+        self._entries = {}
+        self._inodes = {}
+        self.hits = 0
+        self.misses = 0
+
+        if filename is None or not os.path.isfile(filename):
+            return
+
+        try:
+            with open(filename, 'r') as storefile:
+                data = json.load(storefile)
+        except ValueError:
+            log.warning("Content store '%s' is corrupt; ignoring it", filename)
+            return
+
+        if data.get('fingerprint') != self._fingerprint:
+            log.info("Content store '%s' is out of date; ignoring it",
+                     filename)
+            return
+
+        self._entries = data['entries']
+        log.info("Loaded content store '%s'; %i entries",
+                 filename,
+                 len(self._entries))
+
+    def lookup(self, context):
+        """Returns (licenses, key) for the file read into the FileContext
+        "context". If the store has a result for the file's content,
+        "licenses" is it. Otherwise, "licenses" is None, and the result of
+        scanning the file should be passed to store() along with "key". "key"
+        is None if the file can't be handled at all.
+        """
+        delims = context.get_delims()
+        if not delims:
+            return None, None
+
+        # Same file as one we've already seen, under a name which is scanned
+        # the same way?
+        st = context.stat
+        inode = (st.st_dev, st.st_ino, st.st_size, st.st_mtime,
+                 str(config.get_scan_profile(context.filename)),
+                 json.dumps(delims))
+        key = self._inodes.get(inode)
+
+        if key is None:
+            key = make_key(scanned_id(context.content, context.tail), delims)
+            self._inodes[inode] = key
+
+        return self.get(key), key
+
+    def get(self, key):
+        """Returns the result stored under "key", or None"""
+        licenses = self._entries.get(key)
+        if licenses is not None:
+            licenses = copy.deepcopy(licenses)
+
+        return licenses
+
+    def count(self, hit):
+        """Keep hit/miss statistics. This is separate from lookup() because
+        lookups may be done in worker processes.
+        """
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def store(self, key, licenses):
+        if key is None:
+            return
+
+        # Take a copy; the caller is likely to modify the original when
+        # adding it to a SlicResults
+        self._entries[key] = copy.deepcopy(licenses)
+
+    def save(self):
+        log.info("Content store: %i hits, %i misses", self.hits, self.misses)
+
+        if self._filename is None:
+            return
+
+        log.info("Saving content store '%s'; %i entries",
+                 self._filename,
+                 len(self._entries))
+
+        tmpname = self._filename + ".tmp"
+        with open(tmpname, 'w') as storefile:
+            json.dump({
+                'fingerprint': self._fingerprint,
+                'entries':     self._entries
+            }, storefile)
+
+        os.rename(tmpname, self._filename)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Finds the details of the licenses in a comment: the copyright lines written
+# above each license, and the text of the license itself. Heuristics galore.
+#
+# All the licenses found in a comment are dealt with together. One pass over
+# the lines classifies each of them once (copyright line, continuation,
+# blank, cruft) and finds where each license starts; the copyrights for a
+# license are those found above its start. Start patterns shared by several
+# licenses, as sub-licenses often share their parent's, are searched for once
+# per line. The end of each license is then found by searching back from the
+# end of the comment, which usually stops after a few lines; again, each line
+# is only searched once for each different end pattern.
+###############################################################################
+import re
+
+import utils
+import tracing
+
+log = tracing.get_logger()
+
+# Things to ignore on a line - not a copyright line, and not the license
+_cruft_re = re.compile("""Derived\ from
+                          |Target\ configuration
+                          |[Cc]ontributed\ by
+                          |File:
+                          |File\ speex
+                          |Authors?:
+                          |[Vv]ersion
+                          |Written\ by
+                          |Linux\ for
+                          |You\ can\ look
+                          |available\ under
+                          """, re.VERBOSE)
+
+# A copyright line. This check is in two parts because the first check is a
+# lot cheaper than the second; the second half of the second attempts to
+# catch the (erroneous) form where the person puts their name before the
+# date or copyright symbol.
+_copyright_re = re.compile("[Cc]opyright")
+_copyright_line_re = re.compile("[Cc]opyright ?[\d\(©]|"
+                                "[Cc]opyright.{0,50}?\d{4}")
+
+_blank_re = re.compile("^\s*$")
+# Another (C) line, starting with a year or symbol
+_year_re = re.compile("^\s*(\d{4}|©|\([Cc]\))")
+
+_rubbish_re = re.compile("^([\s\*#\-/]+)")
+_end_cruft_re = re.compile("[\*#\s/]+$")
+
+def find_details(comment, tags, license_data, with_text=True):
+    """Given a comment (list of lines, stripped of comment markers) and the
+    tags of the licenses found in it, returns a list of (copyrights, license
+    text) for each license in turn. "license_data" is the flat compiled
+    license data (Ruleset.flat). If "with_text" is false, the license text is
+    always empty, and isn't looked for.
+    """
+    infos = [license_data[tag] for tag in tags]
+    count = len(infos)
+    starts = [-1] * count
+    found = [[] for n in range(count)]
+
+    # Start regexps still being looked for, and the licenses which use them
+    start_res = {}
+    for n, info in enumerate(infos):
+        start_res.setdefault(info['_start_re'], []).append(n)
+
+    copyrights = []
+    in_copyrights = False
+
+    # Find copyrights and starts
+    for i, line in enumerate(comment):
+        for regexp in start_res.keys():
+            if regexp.search(line):
+                if tracing.enabled:
+                    tracing.trace("First license line: %s", line)
+                # We only find copyrights written above the license. If we
+                # carried on, we'd end up combining copyrights when there are
+                # multiple licenses in a file :-| No good option.
+                for n in start_res.pop(regexp):
+                    starts[n] = i
+                    found[n] = list(copyrights)
+
+        if not start_res:
+            break
+
+        if tracing.enabled:
+            tracing.trace("Line: %s", line)
+        if _copyright_re.search(line) and _copyright_line_re.search(line):
+            if tracing.enabled:
+                tracing.trace("Copyright line: %s", line)
+            copyrights.append(line)
+            in_copyrights = True
+            continue
+
+        if in_copyrights:
+            if _blank_re.search(line):
+                if tracing.enabled:
+                    tracing.trace("Blank line (while in copyrights)")
+                in_copyrights = False
+            elif _year_re.search(line):
+                if tracing.enabled:
+                    tracing.trace("Another (C) line starting with year or "
+                                  "symbol")
+                copyrights.append("Copyright " + line)
+            elif _cruft_re.search(line):
+                if tracing.enabled:
+                    tracing.trace("Line with ignorable cruft")
+                in_copyrights = False
+            else:
+                # Continuation line of previous copyright line
+                if tracing.enabled:
+                    tracing.trace("CopyConti line: %s", line)
+                copyrights[-1] = copyrights[-1] + " " + line
+
+    # Lines which each end regexp has been searched for in, and matched
+    end_matches = {}
+
+    details = []
+    for n, info in enumerate(infos):
+        if starts[n] == -1:
+            log.warning("Can't find start line for license '%s'!", tags[n])
+            details.append(([], []))
+            continue
+
+        text = []
+        if with_text:
+            end_line = _find_end(comment, tags[n], info, starts[n],
+                                 end_matches.setdefault(info['_end_re'], {}))
+            text = remove_initial_rubbish(comment[starts[n]:end_line + 1])
+
+        details.append((remove_initial_rubbish(found[n]), text))
+
+    return details
+
+def _find_end(comment, tag, info, start_line, matches):
+    """Find the last line of the license "tag" which starts at "start_line",
+    starting from the end of the comment. "matches" caches whether lines
+    match the license's end regexp.
+    """
+    end_re = info['_end_re']
+    end_line = -1
+    for i in range(len(comment) - 1, -1, -1):
+        matched = matches.get(i)
+        if matched is None:
+            matched = matches[i] = end_re.search(comment[i]) is not None
+
+        if matched:
+            if tracing.enabled:
+                tracing.trace("Last license line: %s", comment[i])
+            end_line = i
+
+            if (end_line - start_line < info['maxlines']):
+                # If the license seems too long, keep looking in case there's
+                # a nearer end line, otherwise break. This deals with files
+                # where there's multiple copies of the license text, e.g.
+                # concatenated files
+                break
+    else:
+        if end_line == -1:
+            log.warning("Can't find end line for license '%s'!", tag)
+            end_line = len(comment)
+
+    if tracing.enabled:
+        tracing.trace("License extent: line %i to %i", start_line, end_line)
+
+    return end_line
+
+def clean_copyrights(copyrights):
+    """Clean up individual copyright lines, in place"""
+    for i in range(len(copyrights)):
+        # Remove end cruft
+        copyrights[i] = _end_cruft_re.sub("", utils.collapse(copyrights[i]))
+
+    return copyrights
+
+def remove_initial_rubbish(comment):
+    """While comment chars have been removed, some license blocks still
+    have repeated cruft at the start of the line (often a different
+    type of comment char. Or they have leading whitespace.
+
+    We can't just remove all leading whitespace line-by-line as that can
+    mess up formatting. However, we can remove any common prefix of
+    whitespace or random rubbish. For the moment, take whatever's on
+    the first line off every line. The list is changed in place.
+    """
+    if not comment:
+        return comment
+
+    match = _rubbish_re.search(comment[0])
+    if match:
+        rubbish = match.group(0)
+        # Last char is optional; it can be pre-text whitespace which doesn't
+        # appear on blank lines
+        shorter = rubbish[:-1]
+
+        for i in range(len(comment)):
+            line = comment[i]
+            if line.startswith(rubbish):
+                comment[i] = line[len(rubbish):]
+            elif line.startswith(shorter):
+                comment[i] = line[len(shorter):]
+
+    return comment
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Everything slic needs to know about a file on disk, got with a single
+# open(). Only the parts of the file its ScanProfile says to scan are read;
+# usually, that's a single read of the start of it. The same buffer is used
+# for the binary check, for working out the comment delimiters (which may
+# need the shebang line) and for detection, so a file is never opened more
+# than once.
+###############################################################################
+import os
+import mmap
+
+import config
+import utils
+
+# Whether to map files rather than read them. Set by slic's --mmap option;
+# worker processes inherit it.
+USE_MMAP = False
+
+# Marks the delimiters as not yet worked out (None means there aren't any)
+_UNKNOWN = object()
+
+class FileContext(object):
+    def __init__(self, filename, use_mmap=None):
+        """Read the parts of "filename" to be scanned: "content", the start
+        of it, and "tail", the end of it, or None. If "use_mmap" is set, the
+        file is mapped rather than read; by default, USE_MMAP says which.
+        Raises IOError if the file can't be read.
+        """
+        if use_mmap is None:
+            use_mmap = USE_MMAP
+
+        self.filename = filename
+        self._delims = _UNKNOWN
+        profile = config.get_scan_profile(filename)
+
+        with open(filename, 'rb') as fin:
+            self.stat = os.fstat(fin.fileno())
+
+            # Empty files can't be mapped
+            if use_mmap and self.stat.st_size > 0:
+                try:
+                    mapped = mmap.mmap(fin.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+                except (mmap.error, ValueError), ex:
+                    raise IOError("Can't map '%s': %s" % (filename, ex))
+
+                try:
+                    (self.content, self.tail) = profile.select(mapped)
+                finally:
+                    mapped.close()
+            else:
+                (self.content, self.tail) = profile.read(fin,
+                                                         self.stat.st_size)
+
+    def is_binary(self):
+        return utils.is_binary_data(self.content)
+
+    def get_delims(self):
+        """The comment delimiters for the file, as config.get_delims"""
+        if self._delims is _UNKNOWN:
+            self._delims = config.get_delims(self.filename, self.content)
+
+        return self._delims
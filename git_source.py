@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Access to the files in a git revision, straight from the object database,
+# so a revision can be scanned without checking it out.
+#
+# The files are listed using "git ls-tree", and their contents are read
+# through a single long-lived "git cat-file --batch" process.
+###############################################################################
+import subprocess
+
+import tracing
+
+log = tracing.get_logger()
+
+# Modes of tree entries we don't scan
+SYMLINK_MODE = "120000"
+SUBMODULE_MODE = "160000"
+
+class GitError(Exception):
+    pass
+
+def ls_tree(rev, paths=[]):
+    """Generator which yields (path, blob ID, size) for every file in the tree
+    of "rev" (anything git accepts as a tree-ish). Paths are relative to the
+    current directory, and "paths" can be used to limit the listing to some
+    files and directories. Symlinks and submodules are left out.
+    """
+    cmd = ["git", "ls-tree", "-r", "-l", "-z", rev, "--"] + list(paths)
+    log.debug("Running: %r", cmd)
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    output = proc.communicate()[0]
+    if proc.returncode != 0:
+        raise GitError("Can't list tree of '%s'" % rev)
+
+    for entry in output.split("\0"):
+        if not entry:
+            continue
+
+        # Format: <mode> SP <type> SP <object> SP+ <size> TAB <file>
+        info, path = entry.split("\t", 1)
+        mode, type, oid, size = info.split()
+
+        if type != "blob" or mode in (SYMLINK_MODE, SUBMODULE_MODE):
+            log.debug("Skipping '%s' (git mode %s)", path, mode)
+            continue
+
+        yield path, oid, int(size)
+
+
+class CatFile(object):
+    """A "git cat-file --batch" process, for reading many objects cheaply"""
+    def __init__(self):
+        self._proc = subprocess.Popen(["git", "cat-file", "--batch"],
+                                      stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE)
+
+    def read(self, oid, maxbytes=None):
+        """Returns the content of object "oid". If "maxbytes" is given, only
+        that much of it is returned (although all of it is read).
+        """
+        self._proc.stdin.write(oid + "\n")
+        self._proc.stdin.flush()
+
+        header = self._proc.stdout.readline()
+        parts = header.split()
+        if len(parts) != 3:
+            raise GitError("Can't read object %s: %s" % (oid, header.strip()))
+
+        size = int(parts[2])
+        if maxbytes is None:
+            maxbytes = size
+
+        content = self._proc.stdout.read(min(size, maxbytes))
+
+        # Throw away the rest, in manageable pieces
+        remaining = size - len(content)
+        while remaining > 0:
+            remaining -= len(self._proc.stdout.read(min(remaining, 65536)))
+
+        # Each object is followed by a newline
+        self._proc.stdout.read(1)
+
+        return content
+
+    def close(self):
+        self._proc.stdin.close()
+        self._proc.wait()
+
+# All-zero object ID, which git uses for "not in the object database" (e.g.
+# a file in the working tree) and for "doesn't exist"
+NULL_OID = "0" * 40
+
+def diff(since, until=None, paths=[]):
+    """Generator which yields (path, old blob ID, new blob ID) for every file
+    which differs between revisions "since" and "until" (or, if "until" is
+    None, the working tree). Paths are relative to the current directory, and
+    only changes under it are included; "paths" can limit it further. A blob
+    ID is None if the file doesn't exist (or isn't a regular file) on that
+    side, and NULL_OID if it's in the working tree.
+    """
+    cmd = ["git", "diff", "--raw", "-z", "--no-renames", "--no-abbrev",
+           "--relative", since]
+    if until is not None:
+        cmd.append(until)
+    cmd = cmd + ["--"] + list(paths)
+    log.debug("Running: %r", cmd)
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    output = proc.communicate()[0]
+    if proc.returncode != 0:
+        raise GitError("Can't diff '%s' and '%s'" % (since,
+                                                     until or "working tree"))
+
+    # Format: :<old mode> SP <new mode> SP <old oid> SP <new oid> SP <status>
+    # then NUL, the path, NUL
+    fields = output.split("\0")
+    for i in range(0, len(fields) - 1, 2):
+        old_mode, new_mode, old_oid, new_oid, status = fields[i][1:].split()
+        path = fields[i + 1]
+
+        yield path, _blob_or_none(old_mode, old_oid), \
+                    _blob_or_none(new_mode, new_oid)
+
+def _blob_or_none(mode, oid):
+    if mode in ("000000", SYMLINK_MODE, SUBMODULE_MODE):
+        return None
+
+    return oid
@@ -24,7 +24,8 @@
 # where comment chars have been removed and whitespace has been collapsed.
 # The matches are case-sensitive, so your regexps will need to accommodate
 # that. The top-level ones are the most performance-critical, so do not use
-# expensive regexp constructs.
+# expensive regexp constructs. Run check_rules after making changes; it points
+# out such constructs, and fails if a rule costs much more than the others.
 #
 # Once a block has been identified as containing a particular license, you
 # search from the start for a line matching 'start', and from the end
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Compare the licenses of a set of files before and after a change (e.g. a
+# pull request), and report what's different.
+###############################################################################
+import json
+
+def make_report(paths, old, new):
+    """"paths" are the files which changed. "old" and "new" are dicts mapping
+    filenames to lists of license tags, before and after the change. Files
+    not in the dicts weren't there, or weren't scanned.
+
+    Returns a dict with a list of files which now have license info and
+    didn't before ('added'), which had license info and now don't
+    ('removed'), and whose license tags have changed ('changed'), plus the
+    net change in the number of files with each tag ('tags').
+    """
+    report = {
+        'added':   [],
+        'removed': [],
+        'changed': [],
+        'tags':    {}
+    }
+
+    for path in sorted(set(paths)):
+        old_tags = old.get(path)
+        new_tags = new.get(path)
+
+        if old_tags == new_tags:
+            continue
+
+        if old_tags is None:
+            report['added'].append({'file': path, 'tags': new_tags})
+        elif new_tags is None:
+            report['removed'].append({'file': path, 'tags': old_tags})
+        else:
+            report['changed'].append({
+                'file': path,
+                'old':  old_tags,
+                'new':  new_tags
+            })
+
+        for tag in old_tags or []:
+            report['tags'][tag] = report['tags'].get(tag, 0) - 1
+        for tag in new_tags or []:
+            report['tags'][tag] = report['tags'].get(tag, 0) + 1
+
+    report['tags'] = dict((tag, count)
+                          for (tag, count) in report['tags'].iteritems()
+                          if count != 0)
+
+    return report
+
+def to_string(report):
+    return json.dumps(report, indent=2, sort_keys=True)
+
+def to_plain_string(report):
+    lines = []
+    for entry in report['added']:
+        lines.append("A %s: %s" % (entry['file'], ", ".join(entry['tags'])))
+    for entry in report['removed']:
+        lines.append("D %s: %s" % (entry['file'], ", ".join(entry['tags'])))
+    for entry in report['changed']:
+        lines.append("M %s: %s -> %s" % (entry['file'],
+                                         ", ".join(entry['old']),
+                                         ", ".join(entry['new'])))
+
+    for tag in sorted(report['tags']):
+        lines.append("%+i %s" % (report['tags'][tag], tag))
+
+    return "\n".join(lines)
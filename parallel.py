@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Multi-process scanning for slic. The files to be scanned are fed to a pool
+# of worker processes, each with its own Detector. Results are handed back
+# in the order the files were supplied, so merging them gives exactly the
+# same output as a serial run.
+#
+# With a time limit per file, a WatchdogPool is used instead of the usual
+# multiprocessing.Pool, and files which take too long get a 'timeout' result.
+#
+# multiprocessing.Pool takes items from its input as fast as it can, in a
+# thread of its own, so when they come from a generator which reads files
+# (e.g. blobs from git, with their content), we hold it back: at most
+# MAX_IN_FLIGHT_PER_JOB items per worker are handed to the pool and not yet
+# handed back. (A WatchdogPool only takes items as workers become free.)
+#
+# This relies on the workers being forked from the main process, so that
+# they inherit the configuration which has already been read.
+###############################################################################
+import os
+import sys
+import threading
+import multiprocessing
+
+import detector
+import ruleset
+import rule_profile
+import watchdog
+from scanner import Scanner, ContentItem
+import tracing
+
+log = tracing.get_logger()
+
+# Number of files handed to a worker at a time. Larger values mean less
+# inter-process traffic; smaller ones mean better load balancing.
+CHUNK_SIZE = 16
+
+# Items in flight per worker, with multiprocessing.Pool; at least CHUNK_SIZE
+MAX_IN_FLIGHT_PER_JOB = 4 * CHUNK_SIZE
+
+# The Scanner for this worker process. Each worker builds its own Detector,
+# once, when the pool starts up. The caches, if any, are inherited copies;
+# workers only read from them, and new results are stored by the main process.
+_scanner = None
+_detector = None
+
+def _init_worker(license_data, params, cache, store, rules):
+    global _scanner, _detector
+    _detector = detector.Detector(license_data, params)
+    _scanner = Scanner(_detector, cache, store, rules)
+
+def _scan(item):
+    if isinstance(item, ContentItem):
+        licenses, updates = _scanner.scan_content(item.path,
+                                                  item.content,
+                                                  item.key,
+                                                  item.licenses)
+        name = item.name
+    else:
+        licenses, updates = _scanner.scan(item)
+        name = item
+
+    # The worker's memo counts so far, and, if profiling, the rule profile
+    # of this file, for the stats
+    memo = (os.getpid(),) + _detector.memo_counts()
+    return name, licenses, updates, memo, _detector.take_profile_counts()
+
+
+class _InFlight(object):
+    """Iterating over an _InFlight gives the items in "items", blocking while
+    "limit" of them have been given and not yet marked done().
+    """
+    def __init__(self, items, limit):
+        self._items = items
+        self._slots = threading.Semaphore(limit)
+        self._stopping = False
+        self._error = None
+
+    def __iter__(self):
+        # This runs in the pool's thread, which drops any exception raised
+        # in it; so an error getting the items ends them, and is raised again
+        # by check()
+        try:
+            items = iter(self._items)
+            while True:
+                # Wait before taking the item, which may be read as it's
+                # taken
+                self._slots.acquire()
+                if self._stopping:
+                    return
+
+                try:
+                    item = items.next()
+                except StopIteration:
+                    return
+                yield item
+        except Exception:
+            self._error = sys.exc_info()
+
+    def check(self):
+        """Raise the exception, if any, which ended the items"""
+        if self._error is not None:
+            raise self._error[0], self._error[1], self._error[2]
+
+    def done(self):
+        """Mark an item as done with"""
+        self._slots.release()
+
+    def stop(self):
+        """Give no more items, and unblock the iterator if it's waiting"""
+        self._stopping = True
+        self._slots.release()
+
+
+def _timeout_license(timed_out):
+    # The result for a file which took too long to scan
+    return [{'tag': 'timeout', 'elapsed': round(timed_out.elapsed, 2)}]
+
+def get_license_info(filenames, jobs, license_data, params, results,
+                     cache=None, store=None, rules=None, stats=None,
+                     timeout=None):
+    """Find the licenses of all the files in the iterable "filenames", using
+    "jobs" worker processes, and add them to "results" (a SlicResults or
+    NDJSONWriter).
+    Results are added in the same order as the filenames were supplied.
+    Files whose content has already been read can be given as ContentItems.
+    The ScanCache "cache" and ContentStore "store" are used and updated if
+    given, and binary files are skipped if the SkipRules "rules" are.
+    The workers' memo counts (and rule profiles, if the Detector "params"
+    ask for them) are added to the ScanStats "stats", if given.
+    If "timeout" is given, any file which takes longer than that many seconds
+    to scan is given up on, and its result is a 'timeout' tag with the time
+    it had taken. Such results aren't cached, so the file is tried again
+    next time.
+    """
+    # Compile the rules before forking, so the workers share them
+    ruleset.get_ruleset(license_data)
+
+    log.info("Starting pool of %i workers", jobs)
+    initargs = (license_data, params, cache, store, rules)
+    in_flight = None
+    if timeout:
+        pool = watchdog.WatchdogPool(jobs, timeout, _init_worker, initargs)
+    else:
+        pool = multiprocessing.Pool(jobs, _init_worker, initargs)
+        in_flight = filenames = _InFlight(filenames,
+                                          jobs * MAX_IN_FLIGHT_PER_JOB)
+
+    # Used for updating the caches
+    scanner = Scanner(None, cache, store)
+    # Latest memo counts from each worker, by pid
+    memos = {}
+
+    try:
+        # imap (unlike imap_unordered) returns results in input order
+        for result in pool.imap(_scan, filenames, CHUNK_SIZE):
+            if in_flight is not None:
+                in_flight.done()
+
+            if isinstance(result, watchdog.TimedOut):
+                item = result.item
+                if isinstance(item, ContentItem):
+                    item = item.name
+                results.add_file(item, _timeout_license(result))
+                if stats is not None:
+                    stats.timeouts += 1
+                continue
+
+            filename, licenses, updates, memo, profile = result
+            scanner.update(filename, licenses, updates)
+            results.add_file(filename, licenses)
+            memos[memo[0]] = memo[1:]
+            if profile is not None and stats is not None and \
+               stats.profile is not None:
+                rule_profile.merge(stats.profile, profile)
+
+        if in_flight is not None:
+            in_flight.check()
+        pool.close()
+    except:
+        # The pool's thread may be waiting for an item, and terminate()
+        # waits for it
+        if in_flight is not None:
+            in_flight.stop()
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+        if stats is not None:
+            for (hits, misses) in memos.itervalues():
+                stats.memo_hits += hits
+                stats.memo_misses += misses
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# A cheap test of which license regexps could possibly match some text,
+# so that the full regexps only need to be run for those, and most comments
+# (and many files) can be rejected without running them at all.
+#
+# For each 'match' regexp, we work out from its parse tree a set of literal
+# strings at least one of which must appear in any text it matches. E.g.
+# "GNU(?: General)? Public License" needs " Public License", and
+# "(?:BSD|MIT) license" needs " license". A regexp for which no such set can
+# be found (or whose literals are too short to be worth it) is always a
+# candidate.
+#
+# Removing alternatives which can't match from an alternation doesn't change
+# what the alternation matches, so using the filter never changes results.
+###############################################################################
+import re
+import sre_parse
+import sre_constants
+
+# Literals shorter than this don't filter out enough to be worth checking
+MIN_LITERAL_LENGTH = 3
+
+def _best(candidates):
+    """Choose the most selective of several sets of literals, all of which
+    are required; we guess it's the one whose shortest literal is longest.
+    """
+    best = None
+    for literals in candidates:
+        if best is None or min(map(len, literals)) > min(map(len, best)):
+            best = literals
+
+    return best
+
+def _required(data):
+    """Returns a set of literal strings one of which must appear in any text
+    matched by the parsed regexp "data", or None if we can't tell.
+    """
+    candidates = []
+    run = []
+
+    def end_run():
+        if run:
+            candidates.append(set(["".join(run)]))
+            del run[:]
+
+    for (op, av) in data:
+        if op == sre_constants.LITERAL:
+            run.append(unichr(av))
+            continue
+
+        end_run()
+
+        literals = None
+        if op == sre_constants.SUBPATTERN:
+            literals = _required(av[1])
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            if av[0] >= 1:
+                literals = _required(av[2])
+        elif op == sre_constants.BRANCH:
+            literals = set()
+            for branch in av[1]:
+                branch_literals = _required(branch)
+                if branch_literals is None:
+                    literals = None
+                    break
+                literals.update(branch_literals)
+
+        if literals:
+            candidates.append(literals)
+
+    end_run()
+
+    candidates = [literals for literals in candidates
+                  if min(map(len, literals)) >= MIN_LITERAL_LENGTH]
+
+    return _best(candidates)
+
+def required_literals(regexp):
+    """Returns a set of literal strings one of which must appear in any text
+    the regexp (a string) matches, or None if there's no useful set.
+    """
+    parsed = sre_parse.parse(regexp)
+    if parsed.pattern.flags & (re.IGNORECASE | re.LOCALE | re.UNICODE):
+        return None
+
+    return _required(parsed.data)
+
+def _union(literals):
+    literals = sorted(literals, key=len, reverse=True)
+    return re.compile("|".join(re.escape(literal) for literal in literals))
+
+
+class Prefilter(object):
+    def __init__(self, regexps):
+        """"regexps" is a list of regexps (as strings). Indexes into this list
+        identify them in the results of candidates().
+        """
+        self._count = len(regexps)
+        self._always = []
+        self._literals = []
+
+        for index, regexp in enumerate(regexps):
+            literals = required_literals(regexp)
+            if literals is None:
+                self._always.append(index)
+            else:
+                self._literals.append((index, sorted(literals)))
+
+        all_literals = set()
+        tokens = set()
+        for (index, literals) in self._literals:
+            all_literals.update(literals)
+            for literal in literals:
+                # The longest part without whitespace; see could_match()
+                token = max(literal.split(), key=len) if literal.split() \
+                        else None
+                if token is None:
+                    tokens = None
+                elif tokens is not None:
+                    tokens.add(token)
+
+        self._any_re = _union(all_literals) if all_literals else None
+        self._tokens_re = _union(tokens) if tokens else None
+
+    def could_match(self, content):
+        """A quick test on a whole file's (decoded) content. If it returns
+        False, none of the regexps can match any comment in the file.
+
+        The text the regexps see is made of lines of comments, with comment
+        characters removed, joined together and with whitespace collapsed.
+        So a literal like "Public License" may be split over lines in the
+        file, but each whitespace-free part of it will be in the file as-is.
+        """
+        if self._always or self._tokens_re is None:
+            return True
+
+        return self._tokens_re.search(content) is not None
+
+    def candidates(self, text):
+        """Returns the sorted list of the indexes of the regexps which could
+        match "text".
+        """
+        if len(self._always) == self._count:
+            return range(self._count)
+
+        if self._any_re.search(text) is None:
+            return self._always
+
+        candidates = list(self._always)
+        for (index, literals) in self._literals:
+            for literal in literals:
+                if literal in text:
+                    candidates.append(index)
+                    break
+
+        candidates.sort()
+        return candidates
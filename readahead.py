@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Reads files ahead of time in a pool of threads, so that on slow (e.g.
+# network) filesystems the detector has something to do while the reads are
+# in progress. The detector doesn't need the GIL to be released to benefit;
+# the reading threads spend nearly all their time blocked in the kernel.
+#
+# Results come out in the same order as the files went in. At most "depth"
+# files are in flight (being read, or read and waiting to be scanned) at any
+# one time, so memory use is capped at about depth * MAX_SCAN_BYTES.
+###############################################################################
+import sys
+import time
+import threading
+import Queue
+
+import tracing
+
+log = tracing.get_logger()
+
+# Files in flight per reading thread
+DEPTH_PER_THREAD = 16
+
+# Marks the end of the input
+_END = object()
+
+class _Slot(object):
+    """A place for the result of reading one item"""
+    def __init__(self, item):
+        self.item = item
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class ReadAhead(object):
+    def __init__(self, read, items, threads, stats=None, depth=None):
+        """Iterating over a ReadAhead gives (item, read(item)) for each item
+        in "items", with read() having been called in one of "threads"
+        background threads. Exceptions raised by read(), or by iterating
+        over "items", are raised again in the caller. If a ScanStats "stats"
+        is given, the time spent reading and waiting for reads is added
+        to it.
+        """
+        self._read = read
+        self._items = items
+        self._threads = threads
+        self._stats = stats
+        self._depth = depth or threads * DEPTH_PER_THREAD
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def _feed(self, slots, work):
+        """Hand out the items, in order; runs in its own thread. Blocks when
+        "depth" items are in flight.
+        """
+        try:
+            for item in self._items:
+                if self._stopping:
+                    break
+
+                slot = _Slot(item)
+                slots.put(slot)
+                work.put(slot)
+        except BaseException:
+            slot = _Slot(None)
+            slot.error = sys.exc_info()
+            slot.done.set()
+            slots.put(slot)
+        finally:
+            slots.put(_END)
+            for i in range(self._threads):
+                work.put(None)
+
+    def _work(self, work):
+        """Read items as they are handed out; runs in each reading thread"""
+        while True:
+            slot = work.get()
+            if slot is None:
+                return
+
+            if not self._stopping:
+                start = time.time()
+                try:
+                    slot.result = self._read(slot.item)
+                except BaseException:
+                    slot.error = sys.exc_info()
+
+                if self._stats is not None:
+                    with self._lock:
+                        self._stats.read_time += time.time() - start
+
+            slot.done.set()
+
+    def __iter__(self):
+        slots = Queue.Queue(self._depth)
+        work = Queue.Queue()
+
+        threads = [threading.Thread(target=self._feed, args=(slots, work))]
+        threads.extend(threading.Thread(target=self._work, args=(work,))
+                       for i in range(self._threads))
+        for thread in threads:
+            # Don't hold up exit if the caller gives up part way through
+            thread.daemon = True
+            thread.start()
+
+        log.info("Reading ahead with %i threads", self._threads)
+
+        try:
+            while True:
+                start = time.time()
+                slot = slots.get()
+                if slot is not _END:
+                    slot.done.wait()
+                if self._stats is not None:
+                    self._stats.wait_time += time.time() - start
+
+                if slot is _END:
+                    break
+
+                if slot.error is not None:
+                    raise slot.error[0], slot.error[1], slot.error[2]
+
+                yield slot.item, slot.result
+        finally:
+            # If we stopped early, unblock the feeder so the threads finish
+            self._stopping = True
+            while not slots.empty():
+                try:
+                    slots.get_nowait()
+                except Queue.Empty:
+                    break
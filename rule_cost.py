@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# What each rule in the license data costs, for the check_rules script.
+#
+# Each 'match' regexp is looked at statically, for constructs which make
+# matching slow:
+#
+# * 'nested-repeat' (an error): an unbounded repeat inside another, e.g.
+#   "(?:\w+\s*)+"; these can backtrack for exponential time on text which
+#   nearly matches.
+# * 'dot-star': an unbounded ".*" or ".+", which can run to the end of the
+#   (possibly very long) comment and back each time the rest fails to match.
+#   ".{0,100}" says the same thing, more cheaply.
+# * 'alternation-in-repeat': alternatives inside an unbounded repeat.
+# * 'no-literal': no literal text which any match must contain, so the
+#   prefilter can't rule the regexp out, and it runs on every comment.
+# * 'no-prefix': doesn't start with literal text, so the regexp engine can't
+#   skip quickly to the places where it might match.
+#
+# Each regexp is also timed on its own, searching every comment in a corpus
+# (the comments slic would see in some files, plus some pathological ones),
+# and its cost given relative to that of the median rule, so that the figure
+# means much the same on any machine.
+###############################################################################
+import re
+import time
+import sre_parse
+import sre_constants
+
+import utils
+import prefilter
+import ruleset
+from detector import Detector
+import tracing
+
+log = tracing.get_logger()
+
+# Findings which are errors, rather than warnings
+ERRORS = frozenset(['nested-repeat'])
+
+# Default limit on a rule's cost relative to the median rule
+DEFAULT_BUDGET = 50.0
+
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+
+def _walk(data, in_repeat, findings):
+    # Find the things listed above in the parsed regexp "data"
+    for (op, av) in data:
+        if op in _REPEATS:
+            unbounded = av[1] == sre_constants.MAXREPEAT
+            if unbounded and in_repeat:
+                findings.add('nested-repeat')
+            if unbounded and len(av[2]) == 1 and \
+               av[2][0][0] == sre_constants.ANY:
+                findings.add('dot-star')
+            _walk(av[2], in_repeat or unbounded, findings)
+        elif op == sre_constants.SUBPATTERN:
+            _walk(av[1], in_repeat, findings)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            _walk(av[1], in_repeat, findings)
+        elif op == sre_constants.BRANCH:
+            if in_repeat:
+                findings.add('alternation-in-repeat')
+            for branch in av[1]:
+                _walk(branch, in_repeat, findings)
+
+def analyze(regexp):
+    """Returns the sorted list of findings (see above) for "regexp", a
+    string.
+    """
+    parsed = sre_parse.parse(regexp)
+    findings = set()
+    _walk(parsed.data, False, findings)
+
+    if prefilter.required_literals(regexp) is None:
+        findings.add('no-literal')
+    if not parsed.data or parsed.data[0][0] != sre_constants.LITERAL:
+        findings.add('no-prefix')
+
+    return sorted(findings)
+
+def get_rules(license_data):
+    """Returns (tag, regexp, depth) for each rule in "license_data", where
+    "depth" is 0 for the top level, 1 for the subs of those, and so on. The
+    data is checked and compiled as it is for the detector first, so bad
+    data raises an Exception here too.
+    """
+    tree = ruleset.Ruleset(license_data).tree
+    rules = []
+
+    def add(level, depth):
+        for tag in sorted(level):
+            if tag.startswith("_"):
+                continue
+            rules.append((tag, level[tag]['match'], depth))
+            if 'subs' in level[tag]:
+                add(level[tag]['subs'], depth + 1)
+
+    add(tree, 0)
+    return rules
+
+
+class _CommentCollector(Detector):
+    """A Detector which notes each comment it looks in, as the rules see
+    it: all on one line, with whitespace collapsed.
+    """
+    def __init__(self, license_data):
+        Detector.__init__(self, license_data)
+        self.comments = set()
+
+    def _find_license(self, comment):
+        self.comments.add(utils.collapse(" ".join(comment)))
+        return Detector._find_license(self, comment)
+
+
+def collect_comments(license_data, filenames):
+    """Returns a sorted list of the distinct comments the detector looks in,
+    in the files "filenames".
+    """
+    collector = _CommentCollector(license_data)
+    for filename in filenames:
+        collector.get_license_info(filename)
+
+    return sorted(collector.comments)
+
+def pathological_comments(comments):
+    """Comments of the sort which make regexps run away: long runs of one
+    character, and a huge single-line comment (all of "comments" at once).
+    """
+    return ["*" * 20000,
+            "/" + " *" * 10000,
+            "a" * 20000,
+            " ".join(comments)]
+
+def time_rule(regexp, comments, repeat=3):
+    """Returns (seconds, matches): the shortest time of "repeat" runs to
+    search all of "comments" with "regexp", and how many it matched.
+    """
+    search = re.compile(regexp).search
+    best = None
+    for n in range(repeat):
+        matches = 0
+        start = time.time()
+        for comment in comments:
+            if search(comment) is not None:
+                matches += 1
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best, matches
+
+
+class RuleCost(object):
+    def __init__(self, tag, regexp, depth, seconds, matches, findings):
+        self.tag = tag
+        self.regexp = regexp
+        self.depth = depth
+        self.seconds = seconds
+        self.matches = matches
+        self.findings = findings
+        # Filled in by measure()
+        self.relative = None
+
+    def errors(self):
+        return [finding for finding in self.findings if finding in ERRORS]
+
+
+def measure(license_data, comments, repeat=3):
+    """Returns a RuleCost for each rule in "license_data", timed against
+    "comments", most expensive first.
+    """
+    costs = []
+    for (tag, regexp, depth) in get_rules(license_data):
+        seconds, matches = time_rule(regexp, comments, repeat)
+        costs.append(RuleCost(tag, regexp, depth, seconds, matches,
+                              analyze(regexp)))
+
+    times = sorted(cost.seconds for cost in costs)
+    median = times[len(times) // 2] if times else 0
+    for cost in costs:
+        cost.relative = cost.seconds / median if median else 0.0
+
+    costs.sort(key=lambda cost: (-cost.seconds, cost.tag))
+    return costs
+
+def over_budget(costs, budget=DEFAULT_BUDGET):
+    """Returns the RuleCosts which cost more than "budget" times the median
+    rule, or have errors.
+    """
+    return [cost for cost in costs
+            if cost.relative > budget or cost.errors()]
+
+def to_table(costs):
+    """The costs as a ranked table, for printing"""
+    lines = ["%4s  %9s  %8s  %7s  %-5s  %s" % ("Rank", "Time (ms)", "Relative",
+                                                "Matches", "Level", "Tag")]
+    for rank, cost in enumerate(costs):
+        line = "%4i  %9.2f  %8.1f  %7i  %-5i  %s" % (rank + 1,
+                                                     cost.seconds * 1000,
+                                                     cost.relative,
+                                                     cost.matches,
+                                                     cost.depth,
+                                                     cost.tag)
+        if cost.findings:
+            line += "  [%s]" % ", ".join(cost.findings)
+        lines.append(line)
+
+    return "\n".join(lines)
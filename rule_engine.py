@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Finds which of a set of rules (tagged 'match' regexps, all at one level of
+# the license data) match a piece of text, in a single pass over it.
+#
+# The rules are in groups of GROUP_SIZE, in order of precedence, as they were
+# when each group had to be a regexp of named groups (and Python allowed no
+# more than 100 groups), and they give the same result as those regexps did,
+# run one after the other with finditer(). That is, within a group, the first
+# rule in order which matches at a position is found, and the group's search
+# carries on from the end of its match; so a rule whose match lies inside an
+# earlier match of its group isn't found (the license data relies on this: a
+# more specific rule can hide a general one which matches part of the same
+# text). Rules in different groups never hide each other, however much their
+# matches overlap.
+#
+# All the candidate rules (those the prefilter says could match) of the groups
+# being searched are joined into one alternation without any capturing groups,
+# so there's no limit on the number of rules. We keep track of where each
+# group's search has got to. A group inside one of its own matches is left
+# out of the alternation until the search gets past the end of that match,
+# so a rule which matches a lot of the text (e.g. one starting with ".*")
+# doesn't keep matching again inside it. Each time the alternation matches,
+# we work out which rule matched, for each group being searched, by trying
+# the group's candidate rules, in order, at the match position.
+#
+# The order of the rules within the alternation doesn't change the
+# result (it only finds the next position where some rule matches), so it can
+# be chosen for speed: given a profile (rule_profile.py) of how often each
+# rule matches, the ones which match most often go first, so that where
+# there is a match, it's found after trying fewer rules.
+###############################################################################
+import re
+import time
+
+from prefilter import Prefilter
+import rule_profile
+
+# Number of rules in a group (see above)
+GROUP_SIZE = 99
+
+# Number of alternations kept, for different sets of candidate rules
+MAX_CACHED_RES = 1000
+
+class RuleEngine(object):
+    def __init__(self, tags, regexps, profile=None):
+        """"tags" and "regexps" are parallel lists of the rules' tags and
+        'match' regexps (as strings), in order of precedence. "profile", if
+        given, is a rule profile used to choose the order of the rules in
+        the alternation.
+        """
+        self._tags = tags
+        self._regexps = regexps
+        self._res = [re.compile(regexp) for regexp in regexps]
+        self._prefilter = Prefilter(regexps)
+        self._cache = {}
+
+        # Where each rule comes in the alternation; hottest first, and
+        # otherwise in order of precedence
+        order = range(len(tags))
+        if profile:
+            order.sort(key=lambda index: -rule_profile.heat(profile,
+                                                            tags[index]))
+        self._rank = [0] * len(tags)
+        for (rank, index) in enumerate(order):
+            self._rank[index] = rank
+
+    def __getstate__(self):
+        # The cached alternations are cheap to remake, so aren't saved
+        state = self.__dict__.copy()
+        state['_cache'] = {}
+        return state
+
+    def could_match(self, content):
+        """See Prefilter.could_match"""
+        return self._prefilter.could_match(content)
+
+    def _get_re(self, candidates):
+        """The alternation of the given rules"""
+        key = tuple(candidates)
+        match_re = self._cache.get(key)
+
+        if match_re is None:
+            match_re = re.compile("|".join("(?:%s)" % self._regexps[index]
+                                           for index in
+                                           sorted(candidates,
+                                                  key=self._rank.__getitem__)))
+            if len(self._cache) >= MAX_CACHED_RES:
+                self._cache.clear()
+            self._cache[key] = match_re
+
+        return match_re
+
+    def find(self, text):
+        """Returns the set of tags of the rules which match "text" """
+        tags = set()
+
+        candidates = self._prefilter.candidates(text)
+        if not candidates:
+            return tags
+
+        groups = {}
+        for index in candidates:
+            groups.setdefault(index // GROUP_SIZE, []).append(index)
+
+        # Where the search for each group's rules carries on from: the end of
+        # its last match, or where it's known not to match before. Groups
+        # which can't match again are dropped.
+        resume = dict.fromkeys(groups, 0)
+        pos = 0
+        while resume and pos <= len(text):
+            # The groups not inside a match of their own at "pos"
+            active = [group for group in sorted(resume)
+                      if resume[group] <= pos]
+            waiting = [resume[group] for group in resume
+                       if resume[group] > pos]
+            limit = min(waiting) if waiting else len(text) + 1
+
+            match = self._get_re([index for group in active
+                                  for index in groups[group]]).search(text,
+                                                                      pos)
+            if match is None:
+                for group in active:
+                    del resume[group]
+            elif match.start() >= limit:
+                # Another group's search carries on first; the active
+                # groups have no match before that
+                for group in active:
+                    resume[group] = limit
+            else:
+                start = match.start()
+                for group in active:
+                    # Don't get stuck on an empty match
+                    end = start + 1
+                    for index in groups[group]:
+                        rule_match = self._res[index].match(text, start)
+                        if rule_match is not None:
+                            tags.add(self._tags[index])
+                            end = max(rule_match.end(), end)
+                            break
+                    resume[group] = end
+
+            if resume:
+                pos = min(resume.itervalues())
+
+        return tags
+
+    def profile(self, text, tags, profile):
+        """Add the cost of each rule which could match "text" to the rule
+        profile "profile", by timing it on its own. "tags" are those find()
+        found.
+        """
+        for index in self._prefilter.candidates(text):
+            start = time.time()
+            self._res[index].search(text)
+            tag = self._tags[index]
+            rule_profile.add(profile, tag, tag in tags, time.time() - start)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Profiles of which rules in the license data match, and what they cost, as
+# made by slic --profile (see Detector and RuleEngine.profile()).
+#
+# A profile is a dict, by tag, of [tries, hits, seconds]: how many comments
+# the rule's regexp was run on (those the prefilter didn't rule out, counting
+# each time the same comment turns up), how many of them it matched, and how
+# long it took to run on them. Sub-licenses are only tried on comments their
+# parent matched.
+#
+# The compile_rules script can take a saved profile, and order the rules so
+# that the ones which match most often are tried first (see RuleEngine).
+###############################################################################
+import json
+
+TRIES, HITS, SECONDS = range(3)
+
+def add(profile, tag, hit, seconds):
+    """Count one try of the rule "tag" in "profile" """
+    entry = profile.get(tag)
+    if entry is None:
+        entry = profile[tag] = [0, 0, 0.0]
+
+    entry[TRIES] += 1
+    if hit:
+        entry[HITS] += 1
+    entry[SECONDS] += seconds
+
+def merge(profile, other):
+    """Add the counts in the profile "other" to "profile" """
+    for (tag, counts) in other.iteritems():
+        entry = profile.get(tag)
+        if entry is None:
+            entry = profile[tag] = [0, 0, 0.0]
+
+        for n in (TRIES, HITS, SECONDS):
+            entry[n] += counts[n]
+
+def save(profile, filename):
+    with open(filename, 'w') as profilefile:
+        json.dump(profile, profilefile, indent=1, sort_keys=True)
+
+def load(filename):
+    with open(filename, 'r') as profilefile:
+        return json.load(profilefile)
+
+def heat(profile, tag):
+    """How hot the rule "tag" is: the more often it matches, the hotter"""
+    entry = profile.get(tag)
+    return entry[HITS] if entry is not None else 0
+
+def to_string(profile, top=None):
+    """A report of the rules in "profile", those taking longest first"""
+    tags = sorted(profile, key=lambda tag: (-profile[tag][SECONDS], tag))
+    total = sum(entry[SECONDS] for entry in profile.itervalues())
+
+    lines = ["%9s  %6s  %8s  %8s  %s" % ("Time (ms)", "%", "Tries", "Hits",
+                                         "Tag")]
+    for tag in tags[:top]:
+        (tries, hits, seconds) = profile[tag]
+        lines.append("%9.2f  %6.2f  %8i  %8i  %s" %
+                     (seconds * 1000,
+                      100.0 * seconds / total if total else 0.0,
+                      tries, hits, tag))
+
+    return "\n".join(lines)
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# The license data, checked and compiled into the form the detector uses:
+# every regexp compiled, and a rule engine built for each level of the data.
+#
+# Compiling the rules takes much longer than anything else slic does at
+# startup, so it's done once per process (get_ruleset), and the result can be
+# saved to a file - RULES_FILE, made by the compile_rules script - to be
+# loaded by later runs. The file holds a fingerprint of the source of
+# everything which went into it, and of the Python version, and is ignored
+# if that doesn't match. Python 2 pickles a compiled regexp as just its
+# pattern, which would mean compiling it all over again, so we save the
+# regexp engine's compiled code as well, and hand that straight back to the
+# engine when loading.
+#
+# A Ruleset is never changed once it has been built, so one can be shared by
+# any number of Detectors, in different threads or in forked processes.
+###############################################################################
+import os
+import re
+import sys
+import copy
+import hashlib
+import pickle
+import cPickle
+import threading
+import _sre
+import sre_parse
+import sre_compile
+
+import license_data as license_data_module
+import prefilter
+import rule_engine
+from rule_engine import RuleEngine
+import tracing
+
+log = tracing.get_logger()
+
+DEFAULT_MAX_LINES_IN_LICENSE = 50
+
+# Bump this if the format of the rules file changes
+RULES_VERSION = 1
+
+# The compiled form of the license data in license_data.py
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "license_data.rules")
+
+# Modules whose source affects the compiled rules
+_RULES_MODULES = [license_data_module, prefilter, rule_engine,
+                  sys.modules[__name__]]
+
+# Rulesets already built in this process, by id of the license data
+_rulesets = {}
+_lock = threading.Lock()
+
+def _source_file(module):
+    # __file__ may well be the .pyc
+    return os.path.splitext(module.__file__)[0] + ".py"
+
+def make_fingerprint():
+    """Returns a string which changes whenever anything which can affect
+    the compiled rules changes.
+    """
+    md5 = hashlib.md5()
+    md5.update("version %i\n" % RULES_VERSION)
+    # The regexp engine's code changes between Python versions
+    md5.update("python %s, sre %i\n" % (sys.version, _sre.MAGIC))
+
+    for module in _RULES_MODULES:
+        with open(_source_file(module), 'rb') as sourcefile:
+            md5.update(hashlib.md5(sourcefile.read()).hexdigest())
+
+    return md5.hexdigest()
+
+def get_ruleset(license_data):
+    """Returns the Ruleset for "license_data", building it (or, for the
+    data in license_data.py, loading it from RULES_FILE if that's up to date)
+    if this process doesn't have it already.
+    """
+    with _lock:
+        entry = _rulesets.get(id(license_data))
+        if entry is not None and entry[0] is license_data:
+            return entry[1]
+
+        rules = None
+        if license_data is license_data_module.license_data:
+            rules = load(RULES_FILE)
+
+        if rules is None:
+            rules = Ruleset(license_data)
+
+        # Keep a reference to the data, so its id can't be reused
+        _rulesets[id(license_data)] = (license_data, rules)
+        return rules
+
+def load(filename):
+    """Returns the Ruleset saved in "filename", or None if there isn't one or
+    it is out of date.
+    """
+    try:
+        with open(filename, 'rb') as rulesfile:
+            fingerprint = cPickle.load(rulesfile)
+            if fingerprint != make_fingerprint():
+                log.info("Rules file '%s' is out of date", filename)
+                return None
+
+            rules = cPickle.load(rulesfile)
+    except IOError:
+        log.debug("No rules file '%s'", filename)
+        return None
+    except Exception, ex:
+        log.warning("Can't load rules file '%s': %s", filename, ex)
+        return None
+
+    log.debug("Loaded rules from '%s'", filename)
+    return rules
+
+def save(rules, filename):
+    """Save the Ruleset "rules" to "filename", for load()"""
+    # Write to a temporary file and rename, so a slic starting up meanwhile
+    # never sees half a file
+    tmpname = "%s.%i.tmp" % (filename, os.getpid())
+    try:
+        with open(tmpname, 'wb') as rulesfile:
+            pickler = _Pickler(rulesfile, pickle.HIGHEST_PROTOCOL)
+            pickler.dump(make_fingerprint())
+            pickler.dump(rules)
+
+        os.rename(tmpname, filename)
+    finally:
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+
+def _load_pattern(pattern, flags, code, groups, groupindex, indexgroup):
+    # As sre_compile.compile, from the saved code
+    return _sre.compile(pattern, flags, code, groups, groupindex, indexgroup)
+
+
+class _Pickler(pickle.Pickler):
+    """Saves compiled regexps along with their code"""
+    dispatch = pickle.Pickler.dispatch.copy()
+
+    def save_pattern(self, obj):
+        flags = obj.flags
+        code = sre_compile._code(sre_parse.parse(obj.pattern, flags), flags)
+        indexgroup = [None] * (obj.groups + 1)
+        for (name, index) in obj.groupindex.iteritems():
+            indexgroup[index] = name
+
+        self.save_reduce(_load_pattern,
+                         (obj.pattern, flags, code, obj.groups,
+                          obj.groupindex, indexgroup),
+                         obj=obj)
+
+    dispatch[type(re.compile(""))] = save_pattern
+
+
+class Ruleset(object):
+    def __init__(self, license_data, profile=None):
+        """Check and compile "license_data". The result is in "tree", which
+        has the same shape as the license data, and "flat", which has the
+        same entries, by tag. Raises an Exception if the data is bad.
+        If a rule profile is given, the rule engines try the rules which
+        match most often first; the results are the same either way.
+        """
+        self.flat = {}
+        self.tree = copy.deepcopy(license_data)
+        self._preprocess(self.tree, None, profile)
+
+    def _preprocess(self, license_data, parent, profile):
+        """This function, called recursively, prepares the data structure the
+        detector will use. It does some sanity-checking, then caches compiled
+        versions of all the necessary regexps at the right point in the
+        structure.
+        """
+        tags = []
+        regexps = []
+
+        for (tag, info) in license_data.iteritems():
+            if not tag:
+                raise Exception("Missing tag in license data")
+
+            if re.match("_", tag):
+                raise Exception("Hit tag %s starting with underscore" % tag)
+
+            # Bad things happen if we use the same name twice; detect this
+            # condition and bail so it can be fixed. This won't detect all
+            # instances because if they are at the same level, the later
+            # definition silently overrides the former before we even see the
+            # data. But it helps.
+            if tag in self.flat:
+                raise Exception("Duplicate tag %s in license data" % tag)
+            else:
+                self.flat[tag] = info
+
+            if parent is not None:
+                info['_parent'] = parent
+
+            tags.append(tag)
+            regexps.append(info['match'])
+
+            # Compile or find the appropriate bits of data for determining
+            # the extent of the license block
+            if 'start' in info:
+                info['_start_re'] = re.compile(info['start'])
+            else:
+                self._fill_in_from_parent(info, '_start_re')
+
+            if 'end' in info:
+                info['_end_re'] = re.compile(info['end'])
+            else:
+                self._fill_in_from_parent(info, '_end_re')
+
+            if 'maxlines' not in info:
+                info['maxlines'] = DEFAULT_MAX_LINES_IN_LICENSE
+
+            if 'cancel' in info:
+                info['cancel'] = frozenset(info['cancel'])
+
+        # The rule engine finds which of the 'match' regexps at this level
+        # match a comment, in one pass, however many there are. They are
+        # joined into one regexp, and Python "only supports 100 named
+        # groups" (in fact, it counts all capturing groups). So we must always
+        # use non-capturing groups - (?: ... ) - in the 'match' regexps.
+        license_data['_engine'] = RuleEngine(tags, regexps, profile)
+
+        for (tag, info) in license_data.iteritems():
+            if tag.startswith("_"):
+                continue
+
+            # Recurse if necessary
+            if 'subs' in info:
+                self._preprocess(info['subs'], info, profile)
+
+    def _fill_in_from_parent(self, info, key):
+        """If a member is not present, find the nearest present value from
+        the parents, or default to the 'match' member at the top level.
+        """
+        retval = None
+        pointer = info
+
+        while pointer and retval is None:
+            if key in pointer:
+                retval = pointer[key]
+            else:
+                if '_parent' in pointer:
+                    pointer = pointer['_parent']
+                else:
+                    # Top level
+                    retval = re.compile(info['match'])
+
+        if retval is None:
+            log.warning("_fill_in_from_parent found None; info: %r" % info)
+
+        info[key] = retval
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# A persistent cache of slic results, so that repeated scans of the same tree
+# only need to look at the files which have changed.
+#
+# Entries are keyed on the normalized path, and are only used if the file's
+# size, modification time and inode are the same as when it was scanned. The
+# whole cache is thrown away if the detection rules, the code which applies
+# them, the configuration or the detector parameters change.
+###############################################################################
+import os
+import json
+import copy
+import hashlib
+
+import config
+import detector
+import details
+import comment_lexer
+import file_context
+import license_data
+import prefilter
+import rule_engine
+import ruleset
+import scan_profile
+import utils
+import tracing
+
+log = tracing.get_logger()
+
+# Bump this if the format of the cache file changes
+CACHE_VERSION = 1
+
+# Modules whose source affects the result of scanning a file
+_DETECTION_MODULES = [license_data, detector, config, utils, ruleset,
+                      rule_engine, prefilter, comment_lexer, details,
+                      scan_profile, file_context]
+
+def _source_file(module):
+    # __file__ may well be the .pyc
+    return os.path.splitext(module.__file__)[0] + ".py"
+
+def make_fingerprint(params, include_config=True):
+    """Returns a string which changes whenever anything which can affect
+    the result of scanning a file changes. The configuration, apart from
+    the scan profiles, can be left out if the caller takes care of the
+    parts of it which matter.
+    """
+    md5 = hashlib.md5()
+    md5.update("version %i\n" % CACHE_VERSION)
+
+    for module in _DETECTION_MODULES:
+        with open(_source_file(module), 'rb') as sourcefile:
+            md5.update(hashlib.md5(sourcefile.read()).hexdigest())
+
+    # The config as actually loaded, rather than the files it came from, so
+    # comment changes in the .ini files don't matter. The scan profiles say
+    # which bytes of a file are scanned, so always count.
+    if include_config:
+        sections = sorted(config.config.sections())
+    else:
+        sections = [section for section in ["scan_profiles"]
+                    if config.config.has_section(section)]
+
+    for section in sections:
+        md5.update("[%s]\n" % section)
+        for (option, value) in sorted(config.config.items(section, raw=True)):
+            md5.update("%s=%r\n" % (option, value))
+
+    md5.update(json.dumps(params, sort_keys=True))
+
+    return md5.hexdigest()
+
+def _stamp(path):
+    """The metadata which must be unchanged for a cached result to be used.
+    Returns None if the file can't be stat()ed.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    # Python 2 has no st_mtime_ns
+    mtime_ns = getattr(st, 'st_mtime_ns', None)
+    if mtime_ns is None:
+        mtime_ns = int(round(st.st_mtime * 1e9))
+
+    return [st.st_size, mtime_ns, st.st_ino]
+
+
+class ScanCache(object):
+    def __init__(self, filename, params):
+        """Open the cache stored in "filename", if it exists and is still
+        valid for a scan with the given Detector params.
+        """
+        self._filename = filename
+        self._fingerprint = make_fingerprint(params)
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.isfile(filename):
+            log.info("Creating new scan cache '%s'", filename)
+            return
+
+        try:
+            with open(filename, 'r') as cachefile:
+                data = json.load(cachefile)
+        except ValueError:
+            log.warning("Scan cache '%s' is corrupt; ignoring it", filename)
+            return
+
+        if data.get('fingerprint') != self._fingerprint:
+            log.info("Scan cache '%s' is out of date; ignoring it", filename)
+            return
+
+        self._entries = data['entries']
+        log.info("Loaded scan cache '%s'; %i entries",
+                 filename,
+                 len(self._entries))
+
+    def lookup(self, path):
+        """Returns (licenses, stamp). If there's a valid cached result for
+        "path", "licenses" is it and "stamp" is None. Otherwise, "licenses" is
+        None and "stamp" should be passed to store() along with the result of
+        scanning the file.
+        """
+        path = os.path.normpath(path)
+        stamp = _stamp(path)
+        entry = self._entries.get(path)
+
+        if entry is not None and stamp is not None and entry[0] == stamp:
+            return copy.deepcopy(entry[1]), None
+
+        return None, stamp
+
+    def count(self, hit):
+        """Keep hit/miss statistics. This is separate from lookup() because
+        lookups may be done in worker processes.
+        """
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def store(self, path, stamp, licenses):
+        if stamp is None:
+            return
+
+        # Take a copy; the caller is likely to modify the original when
+        # adding it to a SlicResults
+        self._entries[os.path.normpath(path)] = [stamp,
+                                                 copy.deepcopy(licenses)]
+
+    def save(self):
+        log.info("Saving scan cache '%s'; %i hits, %i misses",
+                 self._filename,
+                 self.hits,
+                 self.misses)
+
+        # Write and rename, so an interrupted run can't leave a broken cache
+        tmpname = self._filename + ".tmp"
+        with open(tmpname, 'w') as cachefile:
+            json.dump({
+                'fingerprint': self._fingerprint,
+                'entries':     self._entries
+            }, cachefile)
+
+        os.rename(tmpname, self._filename)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Which parts of a file slic reads and scans for licenses. By default, it's
+# the first DEFAULT_HEADER_BYTES, but the [scan_profiles] section of the
+# config can say otherwise for particular filenames or extensions:
+#
+#   header=<bytes>    scan this much of the start of the file
+#   whole             scan the whole file (up to MAX_WHOLE_FILE_BYTES), e.g.
+#                     for LICENSE files
+#   tail=<bytes>      also scan up to this much of the end of the file, for
+#                     licenses appended to concatenated or amalgamated files
+#   minified=<bytes>  read this much first; if it looks minified (has a
+#                     very long line), scan only that
+#
+# Sizes can be given in kilobytes, e.g. "4k". Only the parts which are
+# needed are read (or, for git blobs, kept).
+###############################################################################
+import re
+
+# The default amount of a file to scan. This number is fairly
+# performance-sensitive.
+DEFAULT_HEADER_BYTES = 32768
+
+# The most of a file which is scanned in "whole" mode
+MAX_WHOLE_FILE_BYTES = 1048576
+
+# A line at least this long means a file is minified
+MINIFIED_LINE_LENGTH = 1000
+
+_size_re = re.compile(r"^(\d+)([kK]?)$")
+
+def looks_minified(data):
+    """Whether the start of a file, "data", suggests it's minified; if so,
+    any license it has will be right at the start. Generated files can have
+    their license anywhere in the header, so only very long lines count.
+    """
+    for line in data.split("\n"):
+        if len(line) >= MINIFIED_LINE_LENGTH:
+            return True
+
+    return False
+
+def _parse_size(value):
+    match = _size_re.match(value)
+    if match is None:
+        raise ValueError("'%s' isn't a number of bytes" % value)
+
+    size = int(match.group(1))
+    if match.group(2):
+        size *= 1024
+
+    return size
+
+def _trim_tail(tail):
+    # Start the tail at the start of a line, so it can be decoded and split
+    # into comments like any other text
+    newline = tail.find("\n")
+    if newline == -1:
+        return tail
+
+    return tail[newline + 1:]
+
+
+class _FileRanges(object):
+    """Reads ranges of an open file, seeking only when necessary"""
+    def __init__(self, fin):
+        self._fin = fin
+        self._pos = 0
+
+    def read(self, start, end):
+        if start != self._pos:
+            self._fin.seek(start)
+        data = self._fin.read(end - start)
+        self._pos = start + len(data)
+
+        return data
+
+
+class ScanProfile(object):
+    def __init__(self, header=DEFAULT_HEADER_BYTES, tail=0, minified=0):
+        """"header" is the number of bytes to scan at the start of a file,
+        or None for the whole file. See above for the others; 0 means "not
+        used".
+        """
+        self.header = header
+        self.tail = tail
+        self.minified = minified
+
+    @classmethod
+    def parse(cls, spec):
+        """Make a profile from its description in the config, e.g.
+        "header=8k, tail=4k". Raises ValueError if it's bad.
+        """
+        profile = cls()
+        for item in re.split(r'\s*,\s*', spec.strip()):
+            if item == "whole":
+                profile.header = None
+                continue
+
+            name, equals, value = item.partition("=")
+            name = name.strip()
+            if not equals or name not in ("header", "tail", "minified"):
+                raise ValueError("'%s' isn't a scan profile setting" % item)
+
+            setattr(profile, name, _parse_size(value.strip()))
+
+        return profile
+
+    def __str__(self):
+        """The profile as it would be written in the config; "" for the
+        default.
+        """
+        items = []
+        if self.header is None:
+            items.append("whole")
+        elif self.header != DEFAULT_HEADER_BYTES:
+            items.append("header=%i" % self.header)
+        if self.tail:
+            items.append("tail=%i" % self.tail)
+        if self.minified:
+            items.append("minified=%i" % self.minified)
+
+        return ", ".join(items)
+
+    def _header_bytes(self):
+        if self.header is None:
+            return MAX_WHOLE_FILE_BYTES
+        return self.header
+
+    def max_read(self):
+        """The number of bytes from the start of a file which need to be
+        read, or None if the end of the file is needed too.
+        """
+        if self.tail:
+            return None
+
+        return self._header_bytes()
+
+    def read(self, fin, size):
+        """Read what is to be scanned from the open file "fin", of "size"
+        bytes. Returns (header, tail); "tail" is None if there's nothing to
+        scan but the header.
+        """
+        return self._select(_FileRanges(fin).read, size)
+
+    def select(self, data):
+        """As read(), for a file which is already in memory (or mapped) as
+        "data". If "data" is only the start of the file, the tail is taken
+        from the end of what there is.
+        """
+        return self._select(lambda start, end: data[start:end], len(data))
+
+    def _select(self, read_range, size):
+        header_bytes = self._header_bytes()
+
+        if self.minified and self.minified < header_bytes:
+            header = read_range(0, self.minified)
+            if looks_minified(header):
+                return header, None
+
+            if len(header) == self.minified:
+                header += read_range(len(header), header_bytes)
+        else:
+            header = read_range(0, header_bytes)
+
+        if not self.tail or size <= len(header):
+            return header, None
+
+        start = max(len(header), size - self.tail)
+        rest = read_range(start, size)
+        if start == len(header):
+            # The header and tail meet, so scan them together
+            return header + rest, None
+
+        return header, _trim_tail(rest)
+
+
+DEFAULT = ScanProfile()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Where the time went in a slic run, for the --stats report. In particular,
+# how long was spent waiting for files to be read, as opposed to scanning
+# them; if the former is large, --read-ahead should help.
+###############################################################################
+import time
+
+class ScanStats(object):
+    def __init__(self):
+        self.start = time.time()
+        self.files = 0
+        # Time spent in reading files, summed over any reading threads
+        self.read_time = 0.0
+        self.read_threads = 0
+        # Time the scanning process spent waiting for files to be read
+        self.wait_time = 0.0
+        # Time spent scanning files which had been read
+        self.scan_time = 0.0
+        # Comments whose results were remembered from an earlier comment,
+        # or not
+        self.memo_hits = 0
+        self.memo_misses = 0
+        # Files given up on for taking too long (slic --timeout)
+        self.timeouts = 0
+        # The rule profile, if slic --profile is collecting one
+        self.profile = None
+
+    def to_string(self):
+        elapsed = time.time() - self.start
+        lines = ["Files scanned: %i in %.2fs" % (self.files, elapsed)]
+
+        if self.wait_time or self.scan_time:
+            lines.append("Waiting for I/O: %.2fs" % self.wait_time)
+            lines.append("Computing: %.2fs" % self.scan_time)
+        if self.read_threads:
+            lines.append("Reading: %.2fs, in %i threads" % (self.read_time,
+                                                            self.read_threads))
+        if self.memo_hits or self.memo_misses:
+            lines.append("Comment memo: %i hits, %i misses" %
+                         (self.memo_hits, self.memo_misses))
+        if self.timeouts:
+            lines.append("Timed out: %i files" % self.timeouts)
+
+        return "\n".join(lines)
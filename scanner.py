@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Scans single files, consulting slic's caches (if any) before falling back
+# to running the Detector.
+#
+# Scanning is split into two halves so that it can be done in a worker
+# process: scan() finds the licenses and says which caches need updating,
+# and update() does the updating, in whichever process owns the caches.
+# scan() itself can be split further: read() does the I/O, and can be done
+# ahead of time in another thread (see readahead.py).
+###############################################################################
+import os
+import collections
+
+from content_store import content_key
+from file_context import FileContext
+import tracing
+
+log = tracing.get_logger()
+
+# A file whose content has been read already, e.g. from git. "name" is what
+# the file is called in the results; "path" is used to work out how to scan
+# it. "key" is its ContentStore key, if known, and "licenses" is its result,
+# if that was found in the store already.
+ContentItem = collections.namedtuple('ContentItem',
+                                     ['name', 'path', 'content', 'key',
+                                      'licenses'])
+
+class Scanner(object):
+    def __init__(self, dtr, cache=None, store=None, rules=None):
+        """"dtr" is a Detector; "cache" is a ScanCache and "store" a
+        ContentStore, either or both of which can be None. If the SkipRules
+        "rules" are given, files they say need it are checked to see if
+        they're binary, and skipped if so.
+        """
+        self._dtr = dtr
+        self._cache = cache
+        self._store = store
+        self._rules = rules
+
+    def get_license_info(self, filename):
+        """Drop-in replacement for Detector.get_license_info"""
+        licenses, updates = self.scan(filename)
+        self.update(filename, licenses, updates)
+        return licenses
+
+    def read(self, filename):
+        """The I/O half of scan(): looks the file up in the ScanCache, and if
+        it's not there, reads it. Returns (licenses, stamp, context), where
+        "licenses" is the cached result, if any, and "context" is the
+        FileContext, or None if the file couldn't be read. This can be called
+        from another thread to read files ahead of time.
+        """
+        stamp = None
+
+        if self._cache is not None:
+            licenses, stamp = self._cache.lookup(filename)
+            if licenses is not None:
+                return licenses, None, None
+
+        # The file is only opened and read once, here
+        try:
+            context = FileContext(filename)
+        except IOError, ex:
+            log.warning("Can't read '%s': %s", filename, ex)
+            context = None
+
+        return None, stamp, context
+
+    def scan(self, filename, read=None):
+        """Returns (licenses, updates). "updates" should be passed to
+        update(). "read" is the result of read(), if it's been called
+        already.
+        """
+        if read is None:
+            read = self.read(filename)
+
+        licenses, stamp, context = read
+        key = None
+
+        if licenses is not None:
+            return licenses, ('cache', None, None)
+
+        if context is None:
+            return [], (None, None, None)
+
+        if self._rules is not None and \
+           self._rules.needs_binary_check(os.path.basename(filename)) and \
+           context.is_binary():
+            log.debug("Skipping '%s' (binary).", filename)
+            return [], (None, stamp, None)
+
+        if self._store is not None:
+            licenses, key = self._store.lookup(context)
+            if licenses is not None:
+                return licenses, ('store', stamp, None)
+
+        licenses = self._dtr.get_license_info_from_bytes(context.content,
+                                                         context.get_delims(),
+                                                         filename,
+                                                         context.tail)
+
+        return licenses, (None, stamp, key)
+
+    def scan_content(self, path, content, key=None, licenses=None):
+        """As scan(), for a file whose (raw) content has been read already.
+        See ContentItem for the meaning of the other arguments.
+        """
+        if licenses is not None:
+            return licenses, ('store', None, None)
+
+        if self._store is not None:
+            if key is None:
+                key = content_key(path, content)
+
+            if key is not None:
+                licenses = self._store.get(key)
+                if licenses is not None:
+                    return licenses, ('store', None, None)
+
+        licenses = self._dtr.get_license_info_from_content(path, content)
+
+        return licenses, (None, None, key)
+
+    def update(self, filename, licenses, updates):
+        """Record the result of scanning a file in the caches"""
+        hit, stamp, key = updates
+
+        if self._cache is not None:
+            self._cache.count(hit == 'cache')
+            if hit != 'cache':
+                self._cache.store(filename, stamp, licenses)
+
+        if self._store is not None and hit != 'cache':
+            self._store.count(hit == 'store')
+            if hit != 'store':
+                self._store.store(key, licenses)
+
+    def save(self):
+        """Save the caches (if any) at the end of a run"""
+        if self._cache is not None:
+            self._cache.save()
+
+        if self._store is not None:
+            self._store.save()
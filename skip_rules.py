@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Decides which files and directories slic should skip. The skip_* sections
+# of the config (and the setlist, if any) are compiled once into sets and
+# regular expressions, so the per-path checks are just a few lookups however
+# many entries there are.
+#
+# Entries in skip_files and skip_dirs are normally exact paths, but may also
+# be gitignore-style patterns:
+#
+#   *.min.js            - no "/": matches the name at any depth
+#   out/*/gen           - "/": matches the whole path
+#   **/generated        - "**" matches any number of directories
+#   !out/keep/gen       - "!": re-includes what an earlier entry excluded
+#
+# As in gitignore, the last matching entry wins, and nothing inside a skipped
+# directory can be re-included. (A pattern can't start with "[", as the ini
+# parser would take it for a section header.)
+#
+# .gitignore files found in the tree can also be honoured; see
+# read_gitignore().
+#
+# Paths passed in are expected to be normalized (os.path.normpath).
+###############################################################################
+import os
+import re
+
+import config
+import tracing
+
+log = tracing.get_logger()
+
+_backup_re = re.compile(r"~\d+$")
+
+_glob_chars_re = re.compile(r"[*?\[]")
+
+def _translate(pattern):
+    """Turn a gitignore-style glob into a regular expression (as a string)
+    matching the whole of a relative path.
+    """
+    # A "/" at the start or in the middle anchors the pattern to the top;
+    # otherwise it can match at any depth
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    if pattern.startswith("**/"):
+        pattern = pattern[3:]
+        anchored = False
+
+    res = [] if anchored else ["(?:.*/)?"]
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == "*":
+            if pattern.startswith("*/", i):
+                res.append("(?:.*/)?")
+                i += 2
+            elif pattern.startswith("*", i):
+                res.append(".*")
+                i += 1
+            else:
+                res.append("[^/]*")
+        elif c == "?":
+            res.append("[^/]")
+        elif c == "[":
+            j = i
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            j = pattern.find("]", j)
+            if j == -1:
+                res.append(re.escape(c))
+            else:
+                chars = pattern[i:j].replace("\\", "\\\\")
+                if chars[0] in "!^":
+                    chars = "^" + chars[1:]
+                res.append("[%s]" % chars)
+                i = j + 1
+        elif c == "\\" and i < n:
+            res.append(re.escape(pattern[i]))
+            i += 1
+        else:
+            res.append(re.escape(c))
+
+    return "".join(res) + r"\Z"
+
+
+class PatternList(object):
+    """An ordered list of paths and patterns, some perhaps negated with a
+    leading "!". Consecutive entries of the same polarity are compiled
+    together into a set of exact paths plus a single regular expression, and
+    the runs are tried last first, so the first run to match decides.
+
+    If "exact" is set, entries without glob characters are taken to be exact
+    paths (as in the config file); otherwise, they are patterns like any
+    other (as in .gitignore files).
+    """
+    def __init__(self, entries, exact=True):
+        self._runs = []
+
+        run = None
+        for entry in entries:
+            negated = entry.startswith("!")
+            if negated:
+                entry = entry[1:]
+            if not entry:
+                continue
+
+            if run is None or run[0] != negated:
+                run = (negated, set(), [])
+                self._runs.append(run)
+
+            if exact and not _glob_chars_re.search(entry):
+                run[1].add(os.path.normpath(entry))
+            else:
+                run[2].append(_translate(entry))
+
+        self._runs = [(negated, paths, _compile(regexps))
+                      for (negated, paths, regexps) in reversed(self._runs)]
+
+    def __nonzero__(self):
+        return bool(self._runs)
+
+    def match(self, path):
+        """True if "path" is excluded, False if it's explicitly re-included,
+        and None if no entry matches it.
+        """
+        for (negated, paths, regexp) in self._runs:
+            if path in paths or (regexp and regexp.match(path)):
+                return not negated
+
+        return None
+
+def _compile(regexps):
+    if not regexps:
+        return None
+
+    return re.compile("|".join("(?:%s)" % regexp for regexp in regexps))
+
+
+class GitIgnore(object):
+    """The rules from a single .gitignore file. Paths are relative to the
+    directory containing it.
+    """
+    def __init__(self, lines):
+        files, dirs = [], []
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if not line.endswith("\\ "):
+                line = line.rstrip(" ")
+            if not line or line.startswith("#"):
+                continue
+
+            # A trailing "/" means the pattern only matches directories
+            if line.endswith("/"):
+                dirs.append(line.rstrip("/"))
+            else:
+                files.append(line)
+                dirs.append(line)
+
+        self.files = PatternList(files, exact=False)
+        self.dirs = PatternList(dirs, exact=False)
+
+
+class SkipRules(object):
+    def __init__(self, skip_files=[], gitignore=False):
+        """Compile the rules from the current config. "skip_files" is a list
+        of additional (normalized) file paths to skip, e.g. from a setlist.
+        If "gitignore" is set, the walker also honours .gitignore files.
+        """
+        self.gitignore = gitignore
+
+        self._exts = set(config.get_options("skip_exts"))
+        self._filenames = set(config.get_options("skip_filenames"))
+        self._setlist = set(skip_files)
+        self._files = PatternList(config.get_options("skip_files"))
+        self._dirs = PatternList(config.get_options("skip_dirs"))
+        self._dirnames = set(config.get_options("skip_dirnames"))
+
+        # Files with extensions we know the comment style of are assumed to
+        # be text, unless told otherwise
+        self._text_exts = set(config.get_options("ext_to_comment")) - \
+                          set(config.get_options("force_binary_check"))
+
+        # in_skipped_dir() results, by directory
+        self._skipped_dirs = {}
+
+    def skip_file(self, path, basename):
+        """Whether the file should be skipped, based on its name alone"""
+        ext = os.path.splitext(basename)[1]
+
+        if ext in self._exts:
+            log.debug("Skipping '%s' (according to 'skip_exts').", path)
+            return True
+        if basename in self._filenames:
+            log.debug("Skipping '%s' (according to 'skip_filenames').", path)
+            return True
+        if path in self._setlist or self._files.match(path):
+            log.debug("Skipping '%s' (according to 'skip_files').", path)
+            return True
+        if _backup_re.search(basename):
+            log.debug("Skipping '%s' (looks like backup file).", path)
+            return True
+
+        return False
+
+    def skip_dir(self, path, basename):
+        """Whether the directory should be skipped (not including checks
+        on its parents)
+        """
+        if basename in self._dirnames:
+            log.debug("Skipping '%s' (according to skip_dirnames).", path)
+            return True
+        if self._dirs.match(path):
+            log.debug("Skipping '%s' (according to skip_dirs).", path)
+            return True
+
+        return False
+
+    def in_skipped_dir(self, dirpath):
+        """Whether the directory, or any of its parents, should be skipped.
+        For use when paths aren't found by walking the tree.
+        """
+        if dirpath in ("", ".", os.sep):
+            return False
+
+        skipped = self._skipped_dirs.get(dirpath)
+        if skipped is None:
+            parent, basename = os.path.split(dirpath)
+            skipped = self.in_skipped_dir(parent) or \
+                      self.skip_dir(dirpath, basename)
+            self._skipped_dirs[dirpath] = skipped
+
+        return skipped
+
+    def needs_binary_check(self, basename):
+        """Whether the file needs to be looked at to see if it's binary"""
+        return os.path.splitext(basename)[1] not in self._text_exts
+
+    def read_gitignore(self, path):
+        """Returns a GitIgnore for the .gitignore file "path", or None if
+        .gitignore files aren't being honoured or it has no rules.
+        """
+        if not self.gitignore:
+            return None
+
+        try:
+            with open(path) as fh:
+                ignore = GitIgnore(fh)
+        except IOError, ex:
+            log.warning("Can't read '%s': %s" % (path, ex))
+            return None
+
+        if not ignore.dirs:
+            return None
+
+        return ignore
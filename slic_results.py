@@ -40,13 +40,31 @@
 #   ...
 # }
 #
+# slic can also write its results as they are found, one line of JSON per
+# file (see NDJSONWriter); load_ndjson() folds such a stream back into the
+# structure above.
+#
+# With slic --spans, rather than the text and copyrights, each item has a list
+# 'spans', parallel to 'files', of where in each file the license was found
+# (or null, where that isn't known, e.g. for a tag forced by a setlist);
+# materialize() reads the files again to find the text and copyrights of just
+# the licenses which are wanted.
+#
+# Files which slic --timeout gave up on have the tag 'timeout', and a list
+# 'elapsed', parallel to 'files', of how many seconds each had taken (or null,
+# e.g. for a file a setlist says has timed out).
+#
 
+import os
 import json
 import re
 import itertools
 import hashlib
 from utils import collapse
 
+# Number of records NDJSONWriter buffers before writing them out
+BATCH_SIZE = 100
+
 
 # Function to remove false positive differences from a string or array of
 # strings and then return a unique identifier for it
@@ -65,6 +83,26 @@ def make_hash(thing):
     return hash
 
 
+def _add_parallel(item, key, values):
+    # Adds "values" to the list "key" of "item", parallel to its 'files', the
+    # last len(values) of which they are for. Files with no value have None,
+    # and the list is only made once some file has one.
+    if key not in item and values.count(None) == len(values):
+        return
+
+    existing = item.setdefault(key, [])
+    existing.extend([None] * (len(item['files']) - len(values) -
+                              len(existing)))
+    existing.extend(values)
+
+# Copyright lines are kept in sets, which json can't serialize. Sorting them
+# also makes the output independent of the order the files were scanned in.
+def _sorted_list(thing):
+    if isinstance(thing, (set, frozenset)):
+        return sorted(thing)
+    raise TypeError(repr(thing) + " is not JSON serializable")
+
+
 class SlicResults(dict):
     def load_json(self, initval):
         """Populates the Results from JSON, either as string or as filename.
@@ -92,7 +130,50 @@ class SlicResults(dict):
                 bytag[tag] = [occurrence]
 
         self.update(bytag)
-        
+
+    def load_ndjson(self, initval):
+        """Populates the Results from the output of slic --ndjson, given as
+           a filename or an open file. Like load_json, this can be called
+           more than once. If the scan producing the file was interrupted,
+           a partial last line is ignored.
+        """
+        if isinstance(initval, basestring):
+            with open(initval, 'r') as ndjsonfile:
+                return self.load_ndjson(ndjsonfile)
+
+        results = SlicResults()
+        texts = {}
+        partial = None
+
+        for line in initval:
+            if partial is not None:
+                raise ValueError("Bad line in NDJSON input: %r" % partial)
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+            except ValueError:
+                partial = line
+                continue
+
+            for license in record['licenses']:
+                # Each text is only given the first time it's seen
+                key = (license['tag'], license.pop('hash', None))
+                if 'text' in license:
+                    texts[key] = license['text']
+                elif key[1] is not None:
+                    license['text'] = texts[key]
+
+                results.add_info(record['file'], license)
+
+        # As in load_json, the key is the tag
+        bytag = {}
+        for occurrence in results.itervalues():
+            bytag.setdefault(occurrence['tag'], []).append(occurrence)
+
+        self.update(bytag)
+
     def pop_by_re(self, regexps):
         """Creates another SlicResults with all entries which match any of the
         regexps given, and removes them from this one.
@@ -127,6 +208,10 @@ class SlicResults(dict):
                     license['copyrights'].update(data['copyrights'])
                 if 'files' in data:
                     license['files'].extend(data['files'])
+                    for key in ('spans', 'elapsed'):
+                        _add_parallel(license, key,
+                                      data.get(key) or
+                                      [None] * len(data['files']))
                 if 'text' in data:
                     license['text'] = data['text']
 
@@ -154,13 +239,25 @@ class SlicResults(dict):
             self[lic_key][0]['files'].append(filename)
             if 'copyrights' in license:
                 self[lic_key][0]['copyrights'].update(license['copyrights'])
+            _add_parallel(self[lic_key][0], 'spans', [license.get('span')])
+            _add_parallel(self[lic_key][0], 'elapsed',
+                          [license.get('elapsed')])
         else:
             # log.debug("Starting new file list with file %s" % filename)
             license['files'] = [filename]
             if 'copyrights' in license:
                 license['copyrights'] = set(license['copyrights'])
+            if 'span' in license:
+                license['spans'] = [license.pop('span')]
+            if 'elapsed' in license:
+                license['elapsed'] = [license['elapsed']]
             self[lic_key] = [license]
 
+    def add_file(self, filename, licenses):
+        """Adds the list of licenses found in a file"""
+        for license in licenses:
+            self.add_info(filename, license)
+
     def index_by_tag(self):
         """This does directly what writing the data out as JSON and loading it
            again does indirectly - removes the deduplicating hash keys in
@@ -179,7 +276,132 @@ class SlicResults(dict):
         for tag in tags_to_delete:
             del self[tag]
     
+    def materialize(self, regexps="", detector=None):
+        """For results from slic --spans: find the text and copyrights of
+        the licenses whose tags match any of "regexps", by reading the files
+        again, and group them by text, as slic --details would have done.
+        "detector" is the Detector to use; by default, one for the standard
+        license data. Returns the list of files which couldn't be read, or
+        had changed since they were scanned; the licenses in them are left
+        without text.
+        """
+        if detector is None:
+            from detector import Detector
+            from license_data import license_data
+            detector = Detector(license_data, {'details': True})
+
+        found = SlicResults()
+        missing = []
+
+        for occurrence in self.pop_by_re(regexps).itervalues():
+            tag = occurrence['tag']
+            spans = occurrence.get('spans')
+
+            for i, filename in enumerate(occurrence['files']):
+                license = {'tag': tag}
+                span = spans[i] if spans is not None else None
+                details = None
+                if span is not None:
+                    details = detector.get_details_at(filename, tag, span)
+
+                if details is None:
+                    if span is not None:
+                        missing.append(filename)
+                    # Keep whatever was known already
+                    for key in ('copyrights', 'text'):
+                        if key in occurrence:
+                            license[key] = occurrence[key]
+                else:
+                    (license['copyrights'], text) = details
+                    if text is not None:
+                        license['text'] = text
+
+                found.add_info(filename, license)
+
+        # As in load_json, the key is the tag
+        for occurrence in found.itervalues():
+            self.setdefault(occurrence['tag'], []).append(occurrence)
+
+        return missing
+
+    def tags_by_file(self):
+        """Returns a dict mapping each (normalized) filename to the sorted
+        list of license tags found in it.
+        """
+        bytag = {}
+        for data in self.itervalues():
+            for filename in data.get('files', []):
+                filename = os.path.normpath(filename)
+                bytag.setdefault(filename, set()).add(data['tag'])
+
+        return dict((filename, sorted(tags))
+                    for (filename, tags) in bytag.iteritems())
+
     def to_list_string(self):
         # Needs to be a plain list for json to serialize it
         license_list = sorted(self.itervalues(), key=lambda k: k['tag'])
-        return json.dumps(license_list, indent=2)
+        return json.dumps(license_list, indent=2, default=_sorted_list)
+
+
+class NDJSONWriter(object):
+    """Writes results out as they are found, rather than collecting them,
+    as one line of JSON per file:
+
+        {"file": "foo.c", "licenses": [{"tag": ..., "hash": ...,
+                                        "text": [...], "copyrights": [...]}]}
+
+    "hash" and "text" are only present if the text was collected, and the
+    text itself is only written out the first time its tag and hash are
+    seen together.
+    Records are written in batches of "batch_size", so a run which dies part
+    way through still leaves everything but the last few files behind.
+    """
+    def __init__(self, stream, batch_size=BATCH_SIZE):
+        self._stream = stream
+        self._batch_size = batch_size
+        self._batch = []
+        self._seen = set()
+
+    def add_file(self, filename, licenses):
+        """Adds the list of licenses found in a file. As with SlicResults,
+        files with no licenses at all (e.g. binary files) are left out.
+        """
+        if not licenses:
+            return
+
+        entries = []
+        for license in licenses:
+            entry = {'tag': license['tag']}
+
+            if 'text' in license:
+                if len(license['text']) > 0:
+                    hash = make_hash(license['text'])
+                    entry['hash'] = hash
+                    if (license['tag'], hash) not in self._seen:
+                        self._seen.add((license['tag'], hash))
+                        entry['text'] = license['text']
+                else:
+                    entry['text'] = license['text']
+
+            if 'copyrights' in license:
+                entry['copyrights'] = sorted(license['copyrights'])
+
+            if 'span' in license:
+                entry['span'] = license['span']
+
+            if 'elapsed' in license:
+                entry['elapsed'] = license['elapsed']
+
+            entries.append(entry)
+
+        self._batch.append(json.dumps({'file': filename, 'licenses': entries},
+                                      sort_keys=True))
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes out any records not yet written"""
+        if self._batch:
+            self._stream.write("\n".join(self._batch) + "\n")
+            self._batch = []
+        self._stream.flush()
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Generates synthetic source trees of any size, for benchmarking slic (see
+# the bench script). A tree is entirely determined by its number of files
+# and a seed, so the same tree can be made again on another machine, and
+# timings compared. It has a mix of:
+#
+# * 'licensed': source files which start with the start (up to
+#   HEADER_BYTES) of one of the files in test/data/identification, so with
+#   the license headers slic is tested on, followed by some code
+# * 'unlicensed': source files with code and no comments
+# * 'binary': files of random bytes, which slic has to check and skip
+# * 'skipped': files with extensions slic.ini says to skip without reading
+# * 'deep': licensed files, a long way down a chain of directories
+# * 'pathological': files of the kind which make regexps slow: a comment
+#   made of long runs of "*", and a single-line comment of license-like
+#   words which goes on and on
+#
+# in the proportions given by KINDS. Files are spread over directories of
+# about DIR_SIZE files. Making a tree writes a manifest (MANIFEST) in it, so
+# a tree which has already been made isn't made again.
+###############################################################################
+import os
+import json
+import random
+import shutil
+
+# Bump this if the trees generated change
+GENERATOR_VERSION = 1
+
+MANIFEST = ".synth_tree.json"
+
+# Kinds of file, and how often each turns up (out of 1000)
+KINDS = [('licensed', 740),
+         ('unlicensed', 100),
+         ('binary', 60),
+         ('skipped', 60),
+         ('deep', 38),
+         ('pathological', 2)]
+
+# Files per directory
+DIR_SIZE = 100
+
+# How much of each identification file is used as a header
+HEADER_BYTES = 8192
+
+# How far down the deep files are
+DEEP_LEVELS = 30
+
+# Extensions of files with code, but no comments
+_SOURCE_EXTS = [".c", ".cpp", ".h", ".js", ".py", ".java"]
+
+# Binary files, which slic reads and checks
+_BINARY_EXTS = [".dat", ".bin"]
+
+# Some of the extensions in slic.ini's skip_exts
+_SKIPPED_EXTS = [".png", ".jar", ".json", ".patch", ".ttf"]
+
+_IDENTIFICATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "test", "data", "identification")
+
+def _headers(source_dir):
+    # (basename, start of content) for each identification file, in a fixed
+    # order
+    headers = []
+    for (dirpath, dirnames, filenames) in os.walk(source_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.startswith("index.csv"):
+                continue
+
+            with open(os.path.join(dirpath, filename), 'rb') as source:
+                content = source.read(HEADER_BYTES)
+            if len(content) == HEADER_BYTES and "\n" in content:
+                # Don't stop part way through a line
+                content = content[:content.rindex("\n") + 1]
+            headers.append((filename, content))
+
+    return headers
+
+def _code(rng, index):
+    # Some lines of C-like code, with no comments
+    lines = ["int function_%i_%i(int value)" % (index, n) +
+             " { return value * %i; }\n" % rng.randint(2, 1000)
+             for n in range(rng.randint(5, 50))]
+    return "".join(lines)
+
+def _pathological(rng, index):
+    if rng.random() < 0.5:
+        # A banner comment which never seems to end
+        stars = "*" * 200 + "\n"
+        return "/" + stars * rng.randint(200, 500) + "*/\n" + \
+               _code(rng, index)
+
+    words = ["Permission", "is", "hereby", "granted", "under", "the", "terms",
+             "of", "GNU", "General", "Public", "License", "Copyright",
+             "%i" % index]
+    line = " ".join(rng.choice(words) for n in range(rng.randint(5000, 10000)))
+    return "// " + line + "\n" + _code(rng, index)
+
+def _choose_kind(rng):
+    number = rng.randrange(1000)
+    for (kind, share) in KINDS:
+        if number < share:
+            return kind
+        number -= share
+
+def _dir_for(index):
+    # Two levels of directories, DIR_SIZE files in each of the lower ones
+    leaf = index // DIR_SIZE
+    return os.path.join("d%03i" % (leaf // DIR_SIZE), "d%03i" % (leaf %
+                                                                 DIR_SIZE))
+
+def _make_file(rng, index, headers):
+    # Returns (kind, path, content) for file number "index"
+    kind = _choose_kind(rng)
+    directory = _dir_for(index)
+    stem = "f%07i" % index
+
+    if kind in ('licensed', 'deep'):
+        (basename, header) = rng.choice(headers)
+        root, ext = os.path.splitext(basename)
+        name = "%s_%s%s" % (stem, root, ext)
+        content = header + "\n" + _code(rng, index)
+        if kind == 'deep':
+            directory = os.path.join(directory,
+                                     *["level%i" % level
+                                       for level in range(DEEP_LEVELS)])
+    elif kind == 'unlicensed':
+        name = stem + rng.choice(_SOURCE_EXTS)
+        content = _code(rng, index)
+    elif kind == 'binary':
+        name = stem + rng.choice(_BINARY_EXTS)
+        content = "".join(chr(rng.randrange(256))
+                          for n in range(rng.randint(256, 4096)))
+    elif kind == 'skipped':
+        name = stem + rng.choice(_SKIPPED_EXTS)
+        content = _code(rng, index)
+    else:
+        name = stem + ".c"
+        content = _pathological(rng, index)
+
+    return kind, os.path.join(directory, name), content
+
+def read_manifest(root):
+    """Returns the manifest of the tree at "root", or None if there isn't
+    one.
+    """
+    try:
+        with open(os.path.join(root, MANIFEST), 'r') as manifest:
+            return json.load(manifest)
+    except (IOError, ValueError):
+        return None
+
+def generate(root, files, seed=0, source_dir=_IDENTIFICATION_DIR):
+    """Make a tree of "files" files at "root", as described above, unless
+    there is one already, and return its manifest: a dict of the number of
+    files, the seed, and the number of files of each kind. A different
+    synthetic tree at "root" is removed first; raises ValueError if "root"
+    is anything else but an empty directory.
+    """
+    manifest = read_manifest(root)
+    if manifest is not None and manifest['files'] == files and \
+       manifest['seed'] == seed and \
+       manifest['version'] == GENERATOR_VERSION:
+        return manifest
+
+    if manifest is not None:
+        shutil.rmtree(root)
+    elif os.path.exists(root) and (not os.path.isdir(root) or
+                                   os.listdir(root)):
+        raise ValueError("'%s' is in the way, and isn't a synthetic tree" %
+                         root)
+
+    rng = random.Random(seed)
+    headers = _headers(source_dir)
+    kinds = dict((kind, 0) for (kind, share) in KINDS)
+    made = set()
+
+    for index in xrange(files):
+        kind, path, content = _make_file(rng, index, headers)
+        kinds[kind] += 1
+
+        directory = os.path.join(root, os.path.dirname(path))
+        if directory not in made:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            made.add(directory)
+
+        with open(os.path.join(root, path), 'wb') as output:
+            output.write(content)
+
+    manifest = {'version': GENERATOR_VERSION, 'files': files, 'seed': seed,
+                'kinds': kinds}
+    with open(os.path.join(root, MANIFEST), 'w') as output:
+        json.dump(manifest, output, sort_keys=True)
+
+    return manifest
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import os
+import sys
+import shutil
+import tempfile
+
+from nose.tools import *
+
+import benchmark
+
+def _record(seconds, rss, status=0):
+    return {'jobs': 1, 'tree': {'version': 1, 'files': 100, 'seed': 0},
+            'stages': {'slic': {'seconds': seconds, 'max_rss_kb': rss,
+                                'status': status, 'files_per_sec': 1.0}}}
+
+class TestBenchmark():
+    def test_run(self):
+        result = benchmark.run([sys.executable, "-c",
+                                "import sys; sys.exit(3)"])
+        assert_equal(result['status'], 3)
+        assert_true(result['max_rss_kb'] > 0)
+
+    def test_parse_stats(self):
+        stats = "Files scanned: 207 in 0.72s\nWaiting for I/O: 0.40s\n" \
+                "Computing: 12.49s\nTimed out: 2 files\n"
+        assert_equal(benchmark.parse_stats(stats),
+                     {'Waiting for I/O': 0.40, 'Computing': 12.49})
+
+    def test_compare(self):
+        baseline = _record(10.0, 1000)
+        comparison = benchmark.compare(_record(10.5, 1200), baseline)
+        assert_equal(comparison, [('slic', 'seconds', 10.0, 10.5, False),
+                                  ('slic', 'max_rss_kb', 1000, 1200, True)])
+
+        # Small changes in time are noise
+        assert_false(benchmark.compare(_record(0.2, 1000),
+                                       _record(0.1, 1000))[0][-1])
+
+        # A stage which fails now is a regression...
+        failed = _record(20.0, 1000, 1)
+        comparison = benchmark.compare(failed, baseline)
+        assert_equal(comparison, [('slic', 'status', 0, 1, True)])
+        assert_true("now fails REGRESSED" in
+                    benchmark.to_string(failed, comparison))
+
+        # ...but one which failed in the baseline can't be compared
+        assert_equal(benchmark.compare(_record(20.0, 1000),
+                                       _record(10.0, 1000, 1)), [])
+        assert_equal(benchmark.compare(failed, failed), [])
+        assert_true("REGRESSED" in
+                    benchmark.to_string(_record(20.0, 1000),
+                                        benchmark.compare(_record(20.0, 1000),
+                                                          baseline)))
+
+    def test_history(self):
+        dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(dir, "history.jsonl")
+            benchmark.append_history(_record(1.0, 10), filename)
+            benchmark.append_history(_record(2.0, 10), filename)
+            history = benchmark.load_history(filename)
+            assert_equal([record['stages']['slic']['seconds']
+                          for record in history], [1.0, 2.0])
+            assert_true(benchmark.same_tree(history[0], history[1]))
+        finally:
+            shutil.rmtree(dir)
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+from nose.tools import *
+
+import comment_lexer
+from comment_lexer import CommentLexer
+
+BLOCK = ['/*', '*', '*/']
+HASH = ['#']
+
+class TestCommentLexer():
+    def test_all_sets_in_one_pass(self):
+        lines = ["/* Block", " * comment */", "# Hash", "# comment", "code",
+                 "// Line", "/* one */"]
+        lexer = CommentLexer([BLOCK, HASH, ['//'], ['']])
+        assert_equal(lexer.find_comments(lines),
+                     [[(0, 2), (6, 7)], [(2, 4)], [(5, 6)], []])
+
+    def test_run_of_one_line_block_comments(self):
+        lines = ["/* one */", "  /* two */", "/* three", " */", "/* four */"]
+        lexer = CommentLexer([BLOCK])
+        assert_equal(lexer.find_comments(lines), [[(0, 2), (2, 4), (4, 5)]])
+
+    def test_line_comments_include_blank_lines(self):
+        lines = ["# one", "", "   ", "# two", "code", "# three"]
+        lexer = CommentLexer([HASH])
+        assert_equal(lexer.find_comments(lines), [[(0, 4), (5, 6)]])
+
+    def test_unterminated_block_comment(self):
+        lines = ["code", "/* Never", " * ends"]
+        lexer = CommentLexer([BLOCK])
+        assert_equal(lexer.find_comments(lines), [[(1, 3)]])
+
+    def test_strip(self):
+        lines = ["code", "/* Foo", " * Bar */"]
+        lexer = CommentLexer([HASH, BLOCK])
+        assert_equal(lexer.strip(lines, 1, 1, 3), ["Foo", "Bar"])
+        # The lines themselves are left alone
+        assert_equal(lines[1], "/* Foo")
+
+    def test_get_lexer_reuses(self):
+        lexer = comment_lexer.get_lexer([BLOCK, HASH])
+        assert_true(comment_lexer.get_lexer([list(BLOCK), ['#']]) is lexer)
+        assert_true(comment_lexer.get_lexer([HASH, BLOCK]) is not lexer)
+
+    @raises(ValueError)
+    def test_bad_delims(self):
+        CommentLexer([['/*', '*/']])
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+from nose.tools import *
+
+import config
+
+class TestDelims():
+    def teardown(self):
+        config.compile_tables()
+
+    def test_by_name(self):
+        assert_equal(config.get_delims_by_name("foo/bar.c"),
+                     [['/*', '*', '*/'], ['//']])
+        assert_equal(config.get_delims_by_name("foo/Makefile"), [['#']])
+        assert_equal(config.get_delims_by_name("NOTICE"),
+                     [['//'], ['*'], ['']])
+        assert_equal(config.get_delims_by_name("foo/bar.unknown"), None)
+
+    def test_strip_exts(self):
+        assert_equal(config.get_delims_by_name("Makefile.in"), [['#']])
+
+    def test_shebang(self):
+        assert_equal(config.get_delims("foo", "#!/bin/sh\n"), [['#']])
+        assert_equal(config.get_delims("foo", "#!/usr/bin/env node\n"),
+                     [['/*', '*', '*/']])
+        assert_equal(config.get_delims("foo", "Hello\n"), None)
+
+    def test_copies(self):
+        config.get_delims_by_name("bar.c")[0].append("x")
+        assert_equal(config.get_delims_by_name("bar.c")[0], ['/*', '*', '*/'])
+
+    def test_bad_delims(self):
+        config.config.set("ext_to_comment", ".bad", "/*, */")
+        try:
+            assert_raises(config.ConfigError, config.compile_tables)
+        finally:
+            config.config.remove_option("ext_to_comment", ".bad")
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import config
+import os
+import shutil
+import tempfile
+
+from nose.tools import *
+from license_data import license_data
+
+import detector
+from content_store import ContentStore, blob_id
+from scanner import Scanner
+
+class TestContentStore():
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+        self.storefile = os.path.join(self.dir, "store.json")
+        self.dtr = detector.Detector(license_data)
+
+        source = os.path.join("test", "data", "main.cc")
+        self.files = [os.path.join(self.dir, name)
+                      for name in ("a.cc", "b.cc", "c.cc")]
+        shutil.copy(source, self.files[0])
+        shutil.copy(source, self.files[1])
+        os.link(self.files[0], self.files[2])
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def test_blob_id(self):
+        # As given by "git hash-object"
+        assert_equal(blob_id("hello\n"),
+                     "ce013625030ba8dba906f756967f9e9ca394464a")
+
+    def test_dedup(self):
+        store = ContentStore(None, {})
+        scanner = Scanner(self.dtr, None, store)
+        results = [scanner.get_license_info(filename)
+                   for filename in self.files]
+
+        assert_equal(results[0], results[1])
+        assert_equal(results[0], results[2])
+        assert_equal(store.misses, 1)
+        assert_equal(store.hits, 2)
+
+    def test_hard_link_other_type(self):
+        # A hard link whose name gives it other comment delimiters is
+        # scanned as what it's called, as it would be without the store
+        python = os.path.join(self.dir, "a.py")
+        with open(python, 'w') as f:
+            f.write("# This Source Code Form is subject to the terms of the "
+                    "Mozilla Public\n# License, v. 2.0. If a copy of the MPL "
+                    "was not distributed with this\n# file, You can obtain "
+                    "one at http://mozilla.org/MPL/2.0/.\n")
+        c = os.path.join(self.dir, "b.c")
+        os.link(python, c)
+
+        store = ContentStore(None, {})
+        scanner = Scanner(self.dtr, None, store)
+        for filename in (python, c):
+            assert_equal([license['tag'] for license
+                          in scanner.get_license_info(filename)],
+                         [license['tag'] for license
+                          in self.dtr.get_license_info(filename)])
+        assert_equal(store.misses, 2)
+
+    def test_persistence(self):
+        store = ContentStore(self.storefile, {})
+        licenses = Scanner(self.dtr, None, store).get_license_info(
+                                                                self.files[0])
+        store.save()
+
+        store = ContentStore(self.storefile, {})
+        assert_equal(Scanner(self.dtr, None, store).get_license_info(
+                                                                self.files[1]),
+                     licenses)
+        assert_equal(store.hits, 1)
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import re
+
+from nose.tools import *
+from license_data import license_data
+
+import details
+import detector
+
+def _info(start, end, maxlines=50):
+    return {'_start_re': re.compile(start), '_end_re': re.compile(end),
+            'maxlines': maxlines}
+
+class TestDetails():
+    def setup(self):
+        self.comment = """\
+Copyright (C) 2010 Fred Bloggs
+  and friends
+Copyright 2011 George Jones
+
+Permission is granted, under the Foo License, to do anything.
+That's the end of the Foo License.
+Copyright (C) 2012 Someone Else
+Bar License: you can do it too.
+End of Bar.
+""".splitlines()
+        self.data = {
+            'Foo': _info("Foo License, to", "end of the Foo"),
+            'Foo2': _info("Foo License, to", "end of the Foo"),
+            'Bar': _info("Bar License", "End of Bar"),
+            'Baz': _info("Baz License", "End of Baz"),
+        }
+
+    def test_find_details(self):
+        found = details.find_details(self.comment, ['Foo', 'Bar', 'Foo2'],
+                                     self.data)
+
+        foo = (["Copyright (C) 2010 Fred Bloggs   and friends",
+                "Copyright 2011 George Jones"],
+               ["Permission is granted, under the Foo License, to do "
+                "anything.",
+                "That's the end of the Foo License."])
+        assert_equal(found[0], foo)
+        assert_equal(found[2], foo)
+
+        # Copyrights above each license are found
+        assert_equal(found[1][0], foo[0] + ["Copyright (C) 2012 Someone Else"])
+        assert_equal(found[1][1], ["Bar License: you can do it too.",
+                                   "End of Bar."])
+
+    def test_not_found(self):
+        assert_equal(details.find_details(self.comment, ['Baz'], self.data),
+                     [([], [])])
+
+    def test_without_text(self):
+        found = details.find_details(self.comment, ['Foo', 'Bar'], self.data,
+                                     False)
+        assert_equal([text for (copyrights, text) in found], [[], []])
+        assert_equal(len(found[1][0]), 3)
+
+    def test_maxlines(self):
+        # The nearest end line is used if the last one is too far away
+        comment = ["Foo License, to", "end of the Foo"] + [""] * 10 + \
+                  ["end of the Foo"]
+        self.data['Foo']['maxlines'] = 5
+        text = details.find_details(comment, ['Foo'], self.data)[0][1]
+        assert_equal(text, ["Foo License, to", "end of the Foo"])
+
+    def test_clean_copyrights(self):
+        assert_equal(details.clean_copyrights(["Copyright  2010 Fred */",
+                                               "Copyright 2011\tGeorge #"]),
+                     ["Copyright 2010 Fred", "Copyright 2011 George"])
+
+    def test_remove_initial_rubbish(self):
+        assert_equal(details.remove_initial_rubbish([" * One", " *", " * Two",
+                                                     "Three"]),
+                     ["One", "", "Two", "Three"])
+
+    def test_copyrights_only(self):
+        dtr = detector.Detector(license_data, {'copyrights_only': True})
+        content = "# Copyright 2013 Fred Bloggs\n" \
+                  "# This Source Code Form is subject to the terms of the " \
+                  "Mozilla Public\n# License, v. 2.0. If a copy of the MPL " \
+                  "was not distributed with this\n# file, You can obtain " \
+                  "one at http://mozilla.org/MPL/2.0/.\n"
+        licenses = dtr.get_license_info_from_bytes(content, [['#']])
+        assert_equal(licenses, [{'tag': 'MPL-2.0',
+                                 'copyrights': {"Copyright 2013 Fred Bloggs":
+                                                1}}])
+
+if __name__ == '__main__':
+    nose.main()
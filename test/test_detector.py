@@ -7,11 +7,15 @@
 import config
 import os
 import re
+import logging
+import shutil
+import tempfile
 
 from nose.tools import *
 from license_data import license_data
 
 import detector
+import tracing
 
 class TestLicenseMunging():
     def setup(self):
@@ -70,6 +74,101 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
         assert_equal(tags[0], 'MPL-2.0')
         assert_equal(len(tags), 1)
 
+    def test_memo(self):
+        dtr = detector.Detector(license_data, {'details': True})
+
+        first = (dtr._find_license(self.block1),
+                 dtr._get_details(self.block1, ['MPL-2.0']))
+        assert_equal(dtr.memo_counts(), (0, 2))
+
+        # Differently spaced, but the same once collapsed
+        spaced = ["  " + line for line in self.block1]
+        assert_equal(dtr._find_license(spaced), first[0])
+        assert_equal(dtr._get_details(self.block1, ['MPL-2.0']), first[1])
+        assert_equal(dtr.memo_counts(), (2, 2))
+
+        # Changing what we get back doesn't change what's remembered
+        first[1][0][0].append("Copyright (C) 2020 Someone Else")
+        assert_equal(dtr._get_details(self.block1, ['MPL-2.0'])[0][0],
+                     ["Copyright (C) 2010 Fred Bloggs",
+                      "Copyright (C) 2009-2012 George Jones"])
+
+    def test_memo_several_tags(self):
+        # A comment with more than one license, seen twice, with tracing on
+        comment = self.mpl2 + ["", "Alternatively, Permission is hereby "
+                                   "granted, free of charge, to any person"]
+
+        # Log to a file of our own
+        dir = tempfile.mkdtemp()
+        log = tracing.get_logger()
+        (level, handler) = (log.level, tracing._handler)
+        tracing._handler = tracing.AsyncFileHandler(os.path.join(dir,
+                                                                 "%(pid)i"))
+        log.removeHandler(handler)
+        log.addHandler(tracing._handler)
+        try:
+            tracing.set_level(logging.DEBUG)
+            dtr = detector.Detector(license_data)
+            first = dtr._find_license(comment)
+            assert_equal(first, ['MIT', 'MPL-2.0'])
+            assert_equal(dtr._find_license(comment), first)
+            assert_equal(dtr.memo_counts(), (1, 1))
+
+            tracing._handler.flush()
+            with open(tracing._handler.filename()) as logfile:
+                assert_true("DEBUG:slic:Comment seen before; found: "
+                            "('MIT', 'MPL-2.0')\n" in logfile.read())
+        finally:
+            tracing.set_level(level)
+            log.removeHandler(tracing._handler)
+            tracing._handler.close()
+            tracing._handler = handler
+            log.addHandler(handler)
+            shutil.rmtree(dir)
+
+    def test_profile(self):
+        dtr = detector.Detector(license_data, {'profile': True})
+        assert_equal(dtr._find_license(self.block1), ['MPL-2.0'])
+
+        profile = dtr.profile_counts()
+        assert_equal(profile['MPL-2.0'][:2], [1, 1])
+        # Sub-licenses are only tried where their parent matched
+        assert_false('MPL-1.1|GPL-2.0' in profile)
+
+        # Comments seen before count again
+        dtr._find_license(self.block1)
+        assert_equal(profile['MPL-2.0'][:2], [2, 2])
+
+        # Taking the counts starts them again
+        assert_equal(dtr.take_profile_counts(), profile)
+        assert_equal(dtr.take_profile_counts(), None)
+        assert_equal(dtr.profile_counts(), {})
+
+        assert_equal(detector.Detector(license_data).profile_counts(), None)
+        assert_equal(detector.Detector(license_data).take_profile_counts(),
+                     None)
+
+    def test_bytes(self):
+        dtr = detector.Detector(license_data, {'details': True})
+        delims = [['#']]
+        ascii = "#!/bin/sh\n" + "".join("# %s\n" % line
+                                        for line in self.block1)
+
+        # Plain ASCII is scanned without decoding; the result is the same,
+        # and still unicode
+        licenses = dtr.get_license_info_from_bytes(ascii, delims)
+        assert_equal(licenses,
+                     dtr.get_license_info_from_bytes(ascii + "# \xc3\xa9\n",
+                                                     delims))
+        assert_equal(licenses[0]['tag'], 'MPL-2.0')
+        assert_true(isinstance(licenses[0]['copyrights'].keys()[0], unicode))
+        assert_true(isinstance(licenses[0]['text'][0], unicode))
+
+        # Characters which are only line breaks once decoded
+        assert_true(detector._text("a\x0cb") == u"a\x0cb")
+        assert_true(isinstance(detector._text("a\x0cb"), unicode))
+        assert_false(isinstance(detector._text("a\tb"), unicode))
+
     def test_compilation(self):
         # Missing key
         data = { '': { 'start': '', 'match': '', 'end': ''} }
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import config
+import os
+import shutil
+import tempfile
+
+from nose.tools import *
+from license_data import license_data
+
+import detector
+from file_context import FileContext
+from scanner import Scanner
+from skip_rules import SkipRules
+
+class TestFileContext():
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def make_file(self, name, content):
+        filename = os.path.join(self.dir, name)
+        with open(filename, 'wb') as fh:
+            fh.write(content)
+        return filename
+
+    def test_read(self):
+        filename = os.path.join("test", "data", "main.cc")
+        with open(filename, 'rb') as fh:
+            content = fh.read(detector.MAX_SCAN_BYTES)
+
+        for use_mmap in (False, True):
+            context = FileContext(filename, use_mmap)
+            assert_equal(context.content, content)
+            assert_equal(context.stat.st_size, os.path.getsize(filename))
+            assert_false(context.is_binary())
+
+    def test_empty(self):
+        filename = self.make_file("empty", "")
+        for use_mmap in (False, True):
+            context = FileContext(filename, use_mmap)
+            assert_equal(context.content, "")
+            assert_true(context.is_binary())
+
+    def test_shebang(self):
+        filename = self.make_file("script", "#!/bin/sh\n# Hello\n")
+        assert_equal(FileContext(filename).get_delims(), [['#']])
+
+        filename = self.make_file("noscript", "Hello\n")
+        assert_equal(FileContext(filename).get_delims(), None)
+
+    def test_same_as_detector(self):
+        dtr = detector.Detector(license_data, {'details': True})
+        filename = os.path.join("test", "data", "main.cc")
+        context = FileContext(filename)
+        assert_equal(dtr.get_license_info_from_bytes(context.content,
+                                                     context.get_delims(),
+                                                     filename),
+                     dtr.get_license_info(filename))
+
+    def test_scanner_skips_binary(self):
+        filename = self.make_file("foo", "#!/bin/sh\n# Hello\n\x00\x01\x02")
+        dtr = detector.Detector(license_data)
+        assert_equal(Scanner(dtr).get_license_info(filename),
+                     [{'tag': 'none'}])
+        assert_equal(Scanner(dtr, rules=SkipRules()).get_license_info(filename),
+                     [])
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import os
+
+from nose.tools import *
+
+import git_source
+from content_store import blob_id
+
+# These tests need to be run from a git checkout of slic
+class TestGitSource():
+    def test_ls_tree(self):
+        dir = os.path.join("test", "data", "is_binary")
+        entries = list(git_source.ls_tree("HEAD", [dir]))
+        paths = [path for path, oid, size in entries]
+        assert_true(os.path.join(dir, "race.c") in paths)
+
+        for path, oid, size in entries:
+            assert_equal(size, os.path.getsize(path))
+
+    def test_cat_file(self):
+        path = os.path.join("test", "data", "main.cc")
+        entries = list(git_source.ls_tree("HEAD", [path]))
+        assert_equal(len(entries), 1)
+        oid = entries[0][1]
+
+        catfile = git_source.CatFile()
+        try:
+            content = catfile.read(oid)
+            assert_equal(content, open(path, 'rb').read())
+            assert_equal(blob_id(content), oid)
+
+            # Partial reads leave the stream in the right place
+            assert_equal(catfile.read(oid, 10), content[:10])
+            assert_equal(catfile.read(oid), content)
+        finally:
+            catfile.close()
+
+    def test_bad_rev(self):
+        assert_raises(git_source.GitError,
+                      list,
+                      git_source.ls_tree("no-such-revision"))
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+from nose.tools import *
+
+import license_delta
+
+class TestLicenseDelta():
+    def test_make_report(self):
+        old = {
+            'same.c':    ['MIT'],
+            'changed.c': ['MIT'],
+            'gone.c':    ['GPL-2.0'],
+            'other.c':   ['BSD-2-Clause'],
+        }
+        new = {
+            'same.c':    ['MIT'],
+            'changed.c': ['Apache-2.0', 'MIT'],
+            'new.c':     ['MIT'],
+            'other.c':   ['GPL-2.0'],
+        }
+        paths = ['same.c', 'changed.c', 'gone.c', 'new.c']
+
+        report = license_delta.make_report(paths, old, new)
+
+        assert_equal(report['added'], [{'file': 'new.c', 'tags': ['MIT']}])
+        assert_equal(report['removed'],
+                     [{'file': 'gone.c', 'tags': ['GPL-2.0']}])
+        assert_equal(report['changed'], [{'file': 'changed.c',
+                                          'old':  ['MIT'],
+                                          'new':  ['Apache-2.0', 'MIT']}])
+        # other.c didn't change, so isn't included
+        assert_equal(report['tags'], {'Apache-2.0': 1,
+                                      'MIT':        1,
+                                      'GPL-2.0':    -1})
+
+if __name__ == '__main__':
+    nose.main()
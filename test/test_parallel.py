@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import config
+import os
+
+from nose.tools import *
+from license_data import license_data
+
+import detector
+import parallel
+from slic_results import SlicResults
+from scan_stats import ScanStats
+
+class TestParallel():
+    def test_same_as_serial(self):
+        dir = os.path.join("test", "data", "identification")
+        filenames = sorted(os.path.join(dir, filename)
+                           for filename in os.listdir(dir)
+                           if filename != "index.csv" and
+                              os.path.isfile(os.path.join(dir, filename)))
+
+        serial = SlicResults()
+        dtr = detector.Detector(license_data, {'details': True})
+        for filename in filenames:
+            for license in dtr.get_license_info(filename):
+                serial.add_info(filename, license)
+
+        parallel_results = SlicResults()
+        parallel.get_license_info(iter(filenames), 3, license_data,
+                                  {'details': True}, parallel_results)
+
+        assert_equal(parallel_results.to_list_string(),
+                     serial.to_list_string())
+
+        # The same, with a time limit no file comes near
+        watched_results = SlicResults()
+        parallel.get_license_info(iter(filenames), 2, license_data,
+                                  {'details': True}, watched_results,
+                                  timeout=60)
+
+        assert_equal(watched_results.to_list_string(),
+                     serial.to_list_string())
+
+    def test_profile(self):
+        # The workers' rule profiles of each file add up to a serial run's
+        dir = os.path.join("test", "data", "identification")
+        filenames = sorted(os.path.join(dir, filename)
+                           for filename in os.listdir(dir)
+                           if filename != "index.csv" and
+                              os.path.isfile(os.path.join(dir, filename)))
+
+        dtr = detector.Detector(license_data, {'profile': True})
+        for filename in filenames:
+            dtr.get_license_info(filename)
+
+        stats = ScanStats()
+        stats.profile = {}
+        parallel.get_license_info(iter(filenames), 2, license_data,
+                                  {'profile': True}, SlicResults(),
+                                  stats=stats)
+
+        counts = lambda profile: dict((tag, entry[:2])
+                                      for (tag, entry) in profile.iteritems())
+        assert_equal(counts(stats.profile), counts(dtr.profile_counts()))
+
+        # Workers only send profiles if profiling, and only of the file
+        parallel._init_worker(license_data, {}, None, None, None)
+        assert_equal(parallel._scan(filenames[0])[-1], None)
+        parallel._init_worker(license_data, {'profile': True}, None, None,
+                              None)
+        first = parallel._scan(filenames[0])[-1]
+        assert_not_equal(first, None)
+        assert_equal(counts(parallel._scan(filenames[0])[-1]), counts(first))
+
+    def test_in_flight(self):
+        # The pool doesn't take items much faster than results come back
+        filename = os.path.join("test", "data", "main.cc")
+        count = 1000
+        given = [0]
+
+        def items():
+            for n in xrange(count):
+                given[0] += 1
+                yield filename
+
+        class Results(object):
+            def __init__(self):
+                self.files = 0
+                self.most_ahead = 0
+
+            def add_file(self, filename, licenses):
+                self.files += 1
+                self.most_ahead = max(self.most_ahead, given[0] - self.files)
+
+        results = Results()
+        parallel.get_license_info(items(), 2, license_data, {}, results)
+        assert_equal(results.files, count)
+        assert_true(results.most_ahead <= 2 * parallel.MAX_IN_FLIGHT_PER_JOB)
+
+    def test_items_error(self):
+        # An error getting the items is raised in the caller, however the
+        # files are scanned
+        filename = os.path.join("test", "data", "main.cc")
+
+        def items(count):
+            for n in xrange(count):
+                yield filename
+            raise ValueError("Can't list the files")
+
+        # Before any files, part way through the first chunk, and later
+        for count in (0, 5, 20):
+            for timeout in (None, 60):
+                assert_raises(ValueError, parallel.get_license_info,
+                              items(count), 2, license_data, {},
+                              SlicResults(), timeout=timeout)
+
+if __name__ == '__main__':
+    nose.main()
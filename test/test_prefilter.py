@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import re
+
+from nose.tools import *
+
+from prefilter import Prefilter, required_literals
+
+class TestPrefilter():
+    def test_required_literals(self):
+        assert_equal(required_literals(r"GNU(?: General)? Public License"),
+                     set([" Public License"]))
+        assert_equal(required_literals(r"(?:BSD|MIT) license"),
+                     set([" license"]))
+        assert_equal(required_literals(r"(?:the BSD|an MIT)[ ,]"),
+                     set(["the BSD", "an MIT"]))
+        assert_equal(required_literals(r"[Ll]icen[cs]e"), set(["icen"]))
+        assert_equal(required_literals(r"(?:foo)+bar"), set(["foo"]))
+        assert_equal(required_literals(r"(?:foo)?ba"), None)
+        assert_equal(required_literals(r"GPL|.*"), None)
+        assert_equal(required_literals(r"(?i)licen[cs]e"), None)
+
+    def test_candidates(self):
+        pf = Prefilter([r"GNU General Public License",
+                        r"(?:BSD|MIT) license",
+                        r"x?y",
+                        r"Apache License"])
+        assert_equal(pf.candidates("Licensed under the Apache License"),
+                     [2, 3])
+        assert_equal(pf.candidates("Nothing to see here"), [2])
+        assert_equal(pf.candidates("the GNU General Public License, or "
+                                   "the MIT license"), [0, 1, 2])
+
+    def test_could_match(self):
+        pf = Prefilter([r"GNU General Public License", r"Apache License"])
+        assert_true(pf.could_match(u"the GNU General\n * Public License"))
+        assert_true(pf.could_match(u"Apache\n# License"))
+        assert_false(pf.could_match(u"int main(void) { return 0; }"))
+
+        # Any regexp without literals means anything could match
+        pf = Prefilter([r"GNU General Public License", r".*"])
+        assert_true(pf.could_match(u"int main(void) { return 0; }"))
+
+    def test_consistent(self):
+        # Whatever the regexps match, the prefilter must let through
+        regexps = [r"Copyright (?:\(C\) )?\d{4} Fred",
+                   r"(?:Permission|Rights) (?:is|are) granted",
+                   r"Public Domain|public domain"]
+        pf = Prefilter(regexps)
+        texts = ["Copyright 2014 Fred", "Copyright (C) 1999 Fred Bloggs",
+                 "Rights are granted", "Permission is granted to",
+                 "in the public domain", "Copyright Fred"]
+        for text in texts:
+            candidates = pf.candidates(text)
+            for index, regexp in enumerate(regexps):
+                if re.search(regexp, text):
+                    assert_true(index in candidates)
+
+if __name__ == '__main__':
+    nose.main()
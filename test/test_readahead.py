@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import random
+import threading
+import time
+
+from nose.tools import *
+
+from readahead import ReadAhead
+from scan_stats import ScanStats
+
+class TestReadAhead():
+    def test_order(self):
+        def read(item):
+            time.sleep(random.random() / 1000)
+            return item * 2
+
+        stats = ScanStats()
+        results = list(ReadAhead(read, iter(range(200)), 4, stats))
+        assert_equal(results, [(i, i * 2) for i in range(200)])
+        assert_true(stats.read_time > 0)
+
+    def test_backpressure(self):
+        lock = threading.Lock()
+        state = {'read': 0, 'max_ahead': 0}
+
+        def read(item):
+            with lock:
+                state['read'] += 1
+            return item
+
+        for item, result in ReadAhead(read, iter(range(100)), 2, depth=5):
+            time.sleep(0.001)
+            with lock:
+                state['max_ahead'] = max(state['max_ahead'],
+                                         state['read'] - item)
+
+        assert_equal(state['read'], 100)
+        # The one being scanned, plus the ones in the queue
+        assert_true(state['max_ahead'] <= 6)
+
+    def test_read_error(self):
+        def read(item):
+            if item == 5:
+                raise IOError("Oops")
+            return item
+
+        results = []
+        def consume():
+            for item, result in ReadAhead(read, iter(range(10)), 3):
+                results.append(result)
+
+        assert_raises(IOError, consume)
+        assert_equal(results, range(5))
+
+    def test_items_error(self):
+        def items():
+            yield 1
+            raise ValueError("Oops")
+
+        results = []
+        def consume():
+            for item, result in ReadAhead(lambda item: item, items(), 3):
+                results.append(result)
+
+        assert_raises(ValueError, consume)
+        assert_equal(results, [1])
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+from nose.tools import *
+
+import rule_cost
+
+class TestRuleCost():
+    def test_analyze(self):
+        assert_equal(rule_cost.analyze(r"Public License"), [])
+        assert_equal(rule_cost.analyze(r"(?:\w+\s*)+ License"),
+                     ['nested-repeat', 'no-prefix'])
+        assert_equal(rule_cost.analyze(r"Alternatively, the.*Mozilla"),
+                     ['dot-star'])
+        assert_equal(rule_cost.analyze(r"Foo(?:bar|qux)* License"),
+                     ['alternation-in-repeat'])
+        assert_equal(rule_cost.analyze(r"^((?!modification).)*$"),
+                     ['no-literal', 'no-prefix'])
+
+    def test_get_rules(self):
+        data = {
+            'Foo': {'match': "Foo", 'subs': {'Foo_2': {'match': "2"}}},
+            'Bar': {'match': "Bar"},
+        }
+        assert_equal(rule_cost.get_rules(data),
+                     [('Bar', "Bar", 0), ('Foo', "Foo", 0), ('Foo_2', "2", 1)])
+        # The data is checked as for the detector
+        assert_raises(Exception, rule_cost.get_rules,
+                      {'_Foo': {'match': "Foo"}})
+
+    def test_measure(self):
+        data = {
+            'Foo': {'match': "Foo License"},
+            'Bar': {'match': "Bar License"},
+            'Nested': {'match': r"Baz(?:\s*\w+)+ License"},
+        }
+        comments = ["The Foo License", "The Bar License"] * 10
+        costs = rule_cost.measure(data, comments, repeat=1)
+
+        assert_equal(sorted(cost.tag for cost in costs),
+                     ['Bar', 'Foo', 'Nested'])
+        assert_equal(dict((cost.tag, cost.matches) for cost in costs),
+                     {'Foo': 10, 'Bar': 10, 'Nested': 0})
+
+        # Errors always fail; costs only above the budget
+        failed = rule_cost.over_budget(costs, budget=1000000)
+        assert_equal([cost.tag for cost in failed], ['Nested'])
+        assert_true(rule_cost.to_table(costs).startswith("Rank"))
+
+if __name__ == '__main__':
+    nose.main()
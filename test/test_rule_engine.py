@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import re
+
+from nose.tools import *
+
+import rule_engine
+from rule_engine import RuleEngine, GROUP_SIZE
+from license_data import license_data
+import ruleset
+
+class TestRuleEngine():
+    def test_find(self):
+        engine = RuleEngine(["GPL", "LGPL", "MIT"],
+                            [r"GNU General Public License",
+                             r"GNU Lesser General Public License",
+                             r"MIT [Ll]icense"])
+        assert_equal(engine.find("under the GNU General Public License"),
+                     set(["GPL"]))
+        assert_equal(engine.find("GNU Lesser General Public License, or the "
+                                 "MIT license"),
+                     set(["LGPL", "MIT"]))
+        assert_equal(engine.find("Nothing here"), set())
+
+    def test_group_same_as_alternation(self):
+        # Overlapping rules in the same group: the first one in order which
+        # matches at a position wins, and the search carries on from its end
+        tags = ["A", "B", "C", "D"]
+        regexps = [r"foo bar", r"bar baz", r"foo bar baz qux", r"baz"]
+        alternation = re.compile("|".join("(?P<%s>%s)" % (tag, regexp)
+                                          for (tag, regexp)
+                                          in zip(tags, regexps)))
+        engine = RuleEngine(tags, regexps)
+
+        for text in ["foo bar baz qux", "bar baz foo bar", "foo baz",
+                     "xx bar baz foo bar baz qux baz"]:
+            expected = set(match.lastgroup
+                           for match in alternation.finditer(text))
+            assert_equal(engine.find(text), expected)
+
+    def test_groups_dont_hide(self):
+        # A rule's match only hides the rules in its own group
+        count = GROUP_SIZE + 2
+        regexps = [r"foo.*qux", r"bar"] + \
+                  [r"word%i\b" % i for i in range(2, count - 1)] + [r"baz"]
+        engine = RuleEngine(["tag%i" % i for i in range(count)], regexps)
+        assert_equal(engine.find("foo bar baz qux"),
+                     set(["tag0", "tag%i" % (count - 1)]))
+
+    def test_same_as_group_regexps(self):
+        # The same as running a named-group regexp for each group, one after
+        # the other, with finditer()
+        tags = ["A", "B", "C", "D", "E", "F", "G"]
+        regexps = [r"foo bar", r"bar baz", r"foo.*qux", r"baz", r"a",
+                   r"qux\b", r"x*"]
+        texts = ["foo bar baz qux", "bar baz foo bar", "foo baz", "",
+                 "xx bar baz foo bar baz qux baz", "quux fooqux a"]
+
+        size = rule_engine.GROUP_SIZE
+        rule_engine.GROUP_SIZE = 2
+        try:
+            engine = RuleEngine(tags, regexps)
+            for text in texts:
+                expected = set()
+                for first in range(0, len(tags), 2):
+                    group = zip(tags, regexps)[first:first + 2]
+                    alternation = re.compile("|".join("(?P<%s>%s)" % rule
+                                                      for rule in group))
+                    expected.update(match.lastgroup
+                                    for match in alternation.finditer(text))
+                assert_equal(engine.find(text), expected)
+        finally:
+            rule_engine.GROUP_SIZE = size
+
+    def test_overlapping_license_rules(self):
+        engine = ruleset.Ruleset(license_data).tree['_engine']
+
+        # Permissive_GNU2 starts with ".*", so its match takes in the GPL
+        # text; but the rules are in different groups
+        text = "This file is free software; you can redistribute it under " \
+               "the GNU General Public License, with or without " \
+               "modifications, as long as this notice is preserved."
+        assert_equal(engine.find(text), set(["Permissive_GNU2", "GPL-1.0+"]))
+
+        # GPL-2.0_fileref_8 hides GPL-1.0+_1, which is in the same group
+        text = "This code is licenced under the GPL version 2 as described " \
+               "in the COPYING file that acompanies the Linux Kernel."
+        assert_equal(engine.find(text), set(["GPL-2.0_fileref_8"]))
+
+    def test_profile_order(self):
+        # Trying the hottest rules first in the alternation changes nothing
+        tags = ["A", "B", "C", "D"]
+        regexps = [r"foo bar", r"bar baz", r"foo bar baz qux", r"baz"]
+        plain = RuleEngine(tags, regexps)
+        hot = RuleEngine(tags, regexps, {"D": [10, 10, 0.1],
+                                         "C": [10, 5, 0.1]})
+        assert_equal(hot._rank, [2, 3, 1, 0])
+
+        for text in ["foo bar baz qux", "bar baz foo bar", "foo baz",
+                     "xx bar baz foo bar baz qux baz"]:
+            assert_equal(hot.find(text), plain.find(text))
+
+    def test_profile(self):
+        engine = RuleEngine(["GPL", "MIT"],
+                            [r"GNU General Public Licen[cs]e",
+                             r"Permission is hereby granted"])
+        profile = {}
+        text = "under the GNU General Public License"
+        engine.profile(text, engine.find(text), profile)
+        engine.profile("or the GNU General Public Licenze", set(), profile)
+
+        # The MIT rule was ruled out by the prefilter
+        assert_equal(profile.keys(), ["GPL"])
+        assert_equal(profile["GPL"][:2], [2, 1])
+
+    def test_many_rules(self):
+        # More rules than Python allows groups in one regexp
+        count = 250
+        engine = RuleEngine(["tag%i" % i for i in range(count)],
+                            [r"word%i\b" % i for i in range(count)])
+        assert_equal(engine.find("word3 word149 word249"),
+                     set(["tag3", "tag149", "tag249"]))
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import os
+import shutil
+import tempfile
+
+from nose.tools import *
+
+import rule_profile
+
+class TestRuleProfile():
+    def test_add_and_merge(self):
+        profile = {}
+        rule_profile.add(profile, "GPL", True, 0.5)
+        rule_profile.add(profile, "GPL", False, 0.25)
+        assert_equal(profile, {"GPL": [2, 1, 0.75]})
+
+        rule_profile.merge(profile, {"GPL": [1, 1, 0.25], "MIT": [3, 0, 1.0]})
+        assert_equal(profile, {"GPL": [3, 2, 1.0], "MIT": [3, 0, 1.0]})
+
+        assert_equal(rule_profile.heat(profile, "GPL"), 2)
+        assert_equal(rule_profile.heat(profile, "BSD"), 0)
+
+    def test_save_and_load(self):
+        dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(dir, "profile.json")
+            profile = {"GPL": [3, 2, 1.0], "MIT": [3, 0, 2.0]}
+            rule_profile.save(profile, filename)
+            assert_equal(rule_profile.load(filename), profile)
+        finally:
+            shutil.rmtree(dir)
+
+    def test_to_string(self):
+        lines = rule_profile.to_string({"GPL": [3, 2, 1.0],
+                                        "MIT": [3, 0, 3.0]}).splitlines()
+        assert_equal(len(lines), 3)
+        # Longest first
+        assert_true(lines[1].endswith("MIT"))
+        assert_true("75.00" in lines[1])
+
+if __name__ == '__main__':
+    nose.main()
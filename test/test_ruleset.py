@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import os
+import shutil
+import tempfile
+
+from nose.tools import *
+from license_data import license_data
+
+import ruleset
+
+class TestRuleset():
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+        self.rulesfile = os.path.join(self.dir, "license_data.rules")
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def test_save_and_load(self):
+        rules = ruleset.Ruleset(license_data)
+        ruleset.save(rules, self.rulesfile)
+        loaded = ruleset.load(self.rulesfile)
+
+        assert_equal(sorted(loaded.flat.keys()), sorted(rules.flat.keys()))
+        info = loaded.flat['MPL-2.0']
+        assert_equal(info['_start_re'].pattern,
+                     rules.flat['MPL-2.0']['_start_re'].pattern)
+        assert_true(info['_start_re'].search("This Source Code Form is "
+                                             "subject to the terms of the "
+                                             "Mozilla Public"))
+
+        text = "subject to the terms of the Mozilla Public License, v. 2.0."
+        assert_equal(loaded.tree['_engine'].find(text),
+                     rules.tree['_engine'].find(text))
+
+    def test_out_of_date(self):
+        ruleset.save(ruleset.Ruleset(license_data), self.rulesfile)
+
+        old_version = ruleset.RULES_VERSION
+        ruleset.RULES_VERSION += 1
+        try:
+            assert_equal(ruleset.load(self.rulesfile), None)
+        finally:
+            ruleset.RULES_VERSION = old_version
+
+    def test_missing_or_bad(self):
+        assert_equal(ruleset.load(self.rulesfile), None)
+
+        with open(self.rulesfile, 'wb') as rulesfile:
+            rulesfile.write("rubbish")
+        assert_equal(ruleset.load(self.rulesfile), None)
+
+    def test_shared(self):
+        data = { 'foo': { 'match': 'foo' } }
+        rules = ruleset.get_ruleset(data)
+        assert_true(ruleset.get_ruleset(data) is rules)
+        assert_true(ruleset.get_ruleset(dict(data)) is not rules)
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import config
+import os
+import shutil
+import tempfile
+
+from nose.tools import *
+from license_data import license_data
+
+import detector
+from scan_cache import ScanCache, make_fingerprint
+from scanner import Scanner
+
+class TestScanCache():
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+        self.cachefile = os.path.join(self.dir, "cache.json")
+        self.filename = os.path.join(self.dir, "foo.c")
+        shutil.copy(os.path.join("test", "data", "main.cc"), self.filename)
+        self.dtr = detector.Detector(license_data)
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def test_reuse(self):
+        cache = ScanCache(self.cachefile, {})
+        licenses = Scanner(self.dtr, cache).get_license_info(self.filename)
+        assert_equal(cache.misses, 1)
+        cache.save()
+
+        cache = ScanCache(self.cachefile, {})
+        assert_equal(Scanner(self.dtr, cache).get_license_info(self.filename),
+                     licenses)
+        assert_equal(cache.hits, 1)
+
+    def test_changed_file(self):
+        cache = ScanCache(self.cachefile, {})
+        Scanner(self.dtr, cache).get_license_info(self.filename)
+        cache.save()
+
+        with open(self.filename, 'a') as changed:
+            changed.write("// Changed\n")
+
+        cache = ScanCache(self.cachefile, {})
+        licenses, stamp = cache.lookup(self.filename)
+        assert_equal(licenses, None)
+        assert_not_equal(stamp, None)
+
+    def test_changed_params(self):
+        cache = ScanCache(self.cachefile, {})
+        Scanner(self.dtr, cache).get_license_info(self.filename)
+        cache.save()
+
+        cache = ScanCache(self.cachefile, {'details': True})
+        licenses, stamp = cache.lookup(self.filename)
+        assert_equal(licenses, None)
+
+    def test_changed_scan_profiles(self):
+        # What is scanned depends on the scan profiles, so a result from
+        # the cache or the content store can't be used if they change
+        for include_config in (True, False):
+            fingerprint = make_fingerprint({}, include_config)
+            config.config.set("scan_profiles", ".fingerprint", "whole")
+            try:
+                assert_not_equal(make_fingerprint({}, include_config),
+                                 fingerprint)
+            finally:
+                config.config.remove_option("scan_profiles", ".fingerprint")
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import config
+import os
+import shutil
+import tempfile
+
+from nose.tools import *
+from license_data import license_data
+
+import detector
+from scan_profile import ScanProfile, looks_minified, DEFAULT
+
+MPL2 = """\
+/* This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at http://mozilla.org/MPL/2.0/. */
+"""
+
+class TestScanProfile():
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def test_parse(self):
+        profile = ScanProfile.parse("header=8k, tail = 100 ,minified=4k")
+        assert_equal((profile.header, profile.tail, profile.minified),
+                     (8192, 100, 4096))
+        assert_equal(str(profile), "header=8192, tail=100, minified=4096")
+        assert_equal(ScanProfile.parse("whole").header, None)
+        assert_equal(str(DEFAULT), "")
+
+        for spec in ["header", "header=lots", "foo=1", "whole, tail=-1"]:
+            assert_raises(ValueError, ScanProfile.parse, spec)
+
+    def test_default(self):
+        data = "x" * 40000
+        assert_equal(DEFAULT.select(data),
+                     (data[:detector.MAX_SCAN_BYTES], None))
+
+    def test_tail(self):
+        profile = ScanProfile(header=100, tail=50)
+        data = "h" * 1000 + "\nlast line\n"
+        # The tail starts at a line boundary
+        assert_equal(profile.select(data), ("h" * 100, "last line\n"))
+        # Small files are scanned in one piece
+        assert_equal(profile.select(data[-120:]), (data[-120:], None))
+        assert_equal(profile.max_read(), None)
+
+    def test_minified(self):
+        profile = ScanProfile(minified=2000)
+        minified = "/* Hi */\n" + "var a=1;" * 1000
+        assert_equal(profile.select(minified), (minified[:2000], None))
+
+        normal = "/* Hi */\nvar a = 1;\n" * 100
+        assert_equal(profile.select(normal), (normal, None))
+
+        # Generated files aren't minified, and their license can be
+        # anywhere in the header
+        generated = "// @generated by protoc\n" + normal
+        assert_false(looks_minified(generated))
+        assert_equal(profile.select(generated), (generated, None))
+        assert_false(looks_minified(normal))
+
+    def test_read_same_as_select(self):
+        data = "line\n" * 3000 + "var a=1;" * 200 + "\nend\n"
+        filename = os.path.join(self.dir, "foo.js")
+        with open(filename, 'wb') as fh:
+            fh.write(data)
+
+        for profile in [DEFAULT, ScanProfile(header=None),
+                        ScanProfile(header=1000, tail=3000),
+                        ScanProfile(header=1000, tail=100000),
+                        ScanProfile(minified=100)]:
+            with open(filename, 'rb') as fh:
+                assert_equal(profile.read(fh, len(data)),
+                             profile.select(data))
+
+    def test_license_in_tail(self):
+        dtr = detector.Detector(license_data)
+        header = "int a;\n" * 10
+        assert_equal(dtr.get_license_info_from_bytes(header, [['/*', '*', '*/']],
+                                                     "foo.c", MPL2),
+                     [{'tag': 'MPL-2.0'}])
+        assert_equal(dtr.get_license_info_from_bytes(header, [['/*', '*', '*/']],
+                                                     "foo.c"),
+                     [{'tag': 'none'}])
+
+    def test_config(self):
+        assert_equal(config.get_scan_profile("foo/LICENSE").header, None)
+        assert_true(config.get_scan_profile("foo/jquery.js") is DEFAULT)
+        assert_true(config.get_scan_profile("foo/bar.c") is DEFAULT)
+
+        config.config.set("scan_profiles", ".js", "minified=4k")
+        try:
+            config.compile_tables()
+            assert_equal(config.get_scan_profile("foo/jquery.js").minified,
+                         4096)
+        finally:
+            config.config.remove_option("scan_profiles", ".js")
+            config.compile_tables()
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import config
+import os
+import shutil
+import tempfile
+
+from nose.tools import *
+
+import walker
+from skip_rules import SkipRules, PatternList, GitIgnore
+
+class TestSkipRules():
+    def test_skip_file(self):
+        rules = SkipRules(["foo/listed.c"])
+        assert_true(rules.skip_file("foo/bar.png", "bar.png"))
+        assert_true(rules.skip_file("foo/configure", "configure"))
+        assert_true(rules.skip_file("foo/listed.c", "listed.c"))
+        assert_true(rules.skip_file("foo/bar.c~12", "bar.c~12"))
+        assert_false(rules.skip_file("foo/bar.c", "bar.c"))
+        assert_false(rules.skip_file("listed.c", "listed.c"))
+
+    def test_skip_dir(self):
+        rules = SkipRules()
+        assert_true(rules.skip_dir("foo/.git", ".git"))
+        assert_false(rules.skip_dir("foo/bar", "bar"))
+        assert_true(rules.in_skipped_dir("foo/.git/objects"))
+        assert_false(rules.in_skipped_dir("foo/bar"))
+
+    def test_needs_binary_check(self):
+        rules = SkipRules()
+        assert_false(rules.needs_binary_check("foo.c"))
+        assert_true(rules.needs_binary_check("foo.unknown"))
+        # Listed in force_binary_check
+        assert_true(rules.needs_binary_check("foo.doc"))
+
+
+class TestPatternList():
+    def test_exact(self):
+        patterns = PatternList(["foo/bar.c", "./baz"])
+        assert_true(patterns.match("foo/bar.c"))
+        assert_true(patterns.match("baz"))
+        assert_equal(patterns.match("x/foo/bar.c"), None)
+
+    def test_globs(self):
+        patterns = PatternList(["*.min.js", "out/*/gen", "a/**/b",
+                                "**/tmp", "x/**", "[ab]?.h"])
+        assert_true(patterns.match("jquery.min.js"))
+        assert_true(patterns.match("foo/jquery.min.js"))
+        assert_true(patterns.match("out/arm/gen"))
+        assert_equal(patterns.match("out/arm/v7/gen"), None)
+        assert_equal(patterns.match("src/out/arm/gen"), None)
+        assert_true(patterns.match("a/b"))
+        assert_true(patterns.match("a/c/d/b"))
+        assert_true(patterns.match("tmp"))
+        assert_true(patterns.match("c/d/tmp"))
+        assert_true(patterns.match("x/y/z"))
+        assert_equal(patterns.match("x"), None)
+        assert_true(patterns.match("src/a1.h"))
+        assert_equal(patterns.match("src/c1.h"), None)
+
+    def test_negation(self):
+        patterns = PatternList(["*.c", "!keep/*.c", "keep/bad.c"])
+        assert_true(patterns.match("foo.c"))
+        assert_false(patterns.match("keep/good.c"))
+        assert_true(patterns.match("keep/bad.c"))
+        assert_equal(patterns.match("foo.h"), None)
+
+    def test_gitignore(self):
+        ignore = GitIgnore(["# comment\n", "\n", "build/\n", "*.o\n",
+                            "!special.o\n", "/top\n"])
+        assert_true(ignore.dirs.match("build"))
+        assert_true(ignore.dirs.match("src/build"))
+        assert_equal(ignore.files.match("build"), None)
+        assert_true(ignore.files.match("src/foo.o"))
+        assert_false(ignore.files.match("src/special.o"))
+        assert_true(ignore.files.match("top"))
+        assert_equal(ignore.files.match("src/top"), None)
+
+
+class TestWalker():
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+        for dirname in ["a", "a/b", "a/.git", "c"]:
+            os.mkdir(os.path.join(self.dir, dirname))
+        for filename in ["x.c", "a/y.c", "a/b/z.c", "a/.git/config.c",
+                         "c/image.png", "c/text.c"]:
+            with open(os.path.join(self.dir, filename), 'w') as fh:
+                fh.write("/* Hello */\n")
+        os.symlink(os.path.join(self.dir, "a"), os.path.join(self.dir, "link"))
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def test_find_files(self):
+        rules = SkipRules()
+        found = list(walker.find_files(self.dir, rules))
+
+        # Same order as os.walk would give
+        expected = []
+        for root, dirs, files in os.walk(self.dir):
+            dirs[:] = [dir for dir in dirs if dir != ".git"]
+            expected.extend(os.path.join(root, file) for file in files
+                            if not file.endswith(".png"))
+
+        assert_equal(found, expected)
+        assert_equal(len(found), 4)
+
+    def test_gitignore(self):
+        with open(os.path.join(self.dir, ".gitignore"), 'w') as fh:
+            fh.write("y.c\nb/\n")
+        with open(os.path.join(self.dir, "c", ".gitignore"), 'w') as fh:
+            fh.write("*.c\n!/text.c\n")
+
+        found = list(walker.find_files(self.dir, SkipRules(gitignore=True)))
+        found = [os.path.relpath(path, self.dir) for path in found]
+
+        assert_equal(sorted(found), ["c/text.c", "x.c"])
+
+        found = list(walker.find_files(self.dir, SkipRules()))
+        assert_equal(len(found), 4)
+
+if __name__ == '__main__':
+    nose.main()
@@ -7,11 +7,15 @@
 import config
 import os
 import re
+import shutil
+import tempfile
+from StringIO import StringIO
 
 from nose.tools import *
 from license_data import license_data
 
-from slic_results import SlicResults
+from slic_results import SlicResults, NDJSONWriter
+import detector
 
 class TestSlicResults():
     def make_example(self):
@@ -93,5 +97,166 @@ class TestSlicResults():
         assert_equal(len(data['copyrights']), 3)
         assert_equal(len(data['files']), 2)
         
+    def test_tags_by_file(self):
+        res = self.make_example()
+        res.add_info("./foo.html", {'tag': 'MIT'})
+        bytag = res.tags_by_file()
+        assert_equal(bytag['foo.html'], ['BSD-4-Clause', 'MIT'])
+        assert_equal(bytag['bar.html'], ['GPL-2.0'])
+        assert_equal(len(bytag), 4)
+
+    def write_ndjson(self, batch_size=100):
+        text = ["Redistribution and use in source and binary forms"]
+        stream = StringIO()
+        writer = NDJSONWriter(stream, batch_size)
+        writer.add_file("foo.html", [{'tag': 'BSD-4-Clause', 'text': text,
+                                      'copyrights': set(["Copyright A"])}])
+        writer.add_file("bar.html", [{'tag': 'BSD-4-Clause', 'text': text,
+                                      'copyrights': set(["Copyright B"])},
+                                     {'tag': 'MIT'}])
+        writer.add_file("baz.html", [{'tag': 'MIT'}])
+        return writer, stream
+
+    def test_ndjson_writer(self):
+        writer, stream = self.write_ndjson(batch_size=2)
+        lines = stream.getvalue().splitlines()
+        assert_equal(len(lines), 2)
+        writer.flush()
+        lines = stream.getvalue().splitlines()
+        assert_equal(len(lines), 3)
+
+        # The text is only given the first time
+        assert_true('"text"' in lines[0])
+        assert_false('"text"' in lines[1])
+        assert_true('"hash"' in lines[1])
+
+    def test_load_ndjson(self):
+        writer, stream = self.write_ndjson()
+        writer.flush()
+        stream.seek(0)
+
+        res = SlicResults()
+        res.load_ndjson(stream)
+        assert_equal(len(res), 2)
+        bsd = res['BSD-4-Clause']
+        assert_equal(len(bsd), 1)
+        assert_equal(bsd[0]['files'], ["foo.html", "bar.html"])
+        assert_equal(bsd[0]['copyrights'], set(["Copyright A", "Copyright B"]))
+        assert_equal(len(bsd[0]['text']), 1)
+        assert_equal(res['MIT'][0]['files'], ["bar.html", "baz.html"])
+
+    def test_load_ndjson_truncated(self):
+        writer, stream = self.write_ndjson()
+        writer.flush()
+        data = stream.getvalue()
+
+        res = SlicResults()
+        res.load_ndjson(StringIO(data[:-10]))
+        assert_equal(res['MIT'][0]['files'], ["bar.html"])
+
+        # Only the last line can be broken
+        lines = data.splitlines(True)
+        lines[0] = lines[0][:-10] + "\n"
+        assert_raises(ValueError, res.load_ndjson, StringIO("".join(lines)))
+
+    def test_timeouts(self):
+        res = SlicResults()
+        res.add_file("foo.js", [{'tag': 'timeout', 'elapsed': 60.5}])
+        res.add_file("bar.js", [{'tag': 'timeout', 'elapsed': 61.25}])
+
+        # Each file's time is kept
+        timeout = res['timeout'][0]
+        assert_equal(timeout['files'], ["foo.js", "bar.js"])
+        assert_equal(timeout['elapsed'], [60.5, 61.25])
+
+        # Files with no time have None, so the times stay with their files
+        res = SlicResults()
+        res.add_file("forced.js", [{'tag': 'timeout'}])
+        res.add_file("foo.js", [{'tag': 'timeout', 'elapsed': 60.5}])
+        res.add_file("bar.js", [{'tag': 'timeout'}])
+        assert_equal(res['timeout'][0]['elapsed'], [None, 60.5, None])
+
+        res['timeout'].append({'tag': 'timeout', 'files': ["baz.js"]})
+        res['timeout'].append({'tag': 'timeout', 'files': ["qux.js"],
+                               'elapsed': [62.0]})
+        res.unify()
+        assert_equal(res['timeout'][0]['files'], ["forced.js", "foo.js",
+                                                  "bar.js", "baz.js",
+                                                  "qux.js"])
+        assert_equal(res['timeout'][0]['elapsed'],
+                     [None, 60.5, None, None, 62.0])
+
+    def test_spans_parallel(self):
+        # A tag forced by a setlist has no span, and one scanned has
+        res = SlicResults()
+        res.add_file("forced.js", [{'tag': 'MPL-2.0'}])
+        res.add_file("a.js", [{'tag': 'MPL-2.0', 'span': [0, 3]}])
+        res.add_file("b.js", [{'tag': 'MPL-2.0'}])
+        mpl = res['MPL-2.0'][0]
+        assert_equal(mpl['files'], ["forced.js", "a.js", "b.js"])
+        assert_equal(mpl['spans'], [None, [0, 3], None])
+
+        other = SlicResults()
+        other.add_file("c.js", [{'tag': 'MPL-2.0', 'text': ["MPL"]}])
+        other.add_file("d.js", [{'tag': 'MPL-2.0', 'text': ["MPL"],
+                                 'span': [1, 4]}])
+        res['MPL-2.0'].extend(other.values()[0])
+        res.unify()
+        mpl = res['MPL-2.0'][0]
+        assert_equal(mpl['files'], ["forced.js", "a.js", "b.js", "c.js",
+                                    "d.js"])
+        assert_equal(mpl['spans'], [None, [0, 3], None, None, [1, 4]])
+
+        # Files with no span aren't looked at, or reported as missing
+        res = SlicResults()
+        res.add_file("forced.js", [{'tag': 'MPL-2.0'}])
+        res.add_file("gone.js", [{'tag': 'MPL-2.0', 'span': [0, 3]}])
+        missing = res.materialize("MPL",
+                                  detector.Detector(license_data,
+                                                    {'details': True}))
+        assert_equal(missing, ["gone.js"])
+        assert_equal(sorted(res.itervalues().next()['files']),
+                     ["forced.js", "gone.js"])
+
+    def test_materialize(self):
+        dir = tempfile.mkdtemp()
+        try:
+            files = [os.path.join(dir, name) for name in ("a.py", "b.py",
+                                                          "c.py")]
+            header = "# This Source Code Form is subject to the terms of " \
+                     "the Mozilla Public\n# License, v. 2.0. If a copy of " \
+                     "the MPL was not distributed with this\n# file, You " \
+                     "can obtain one at http://mozilla.org/MPL/2.0/.\n"
+            for (n, filename) in enumerate(files):
+                with open(filename, 'w') as f:
+                    f.write("\n" * n + "# Copyright 201%i Fred\n" % n +
+                            header + "import os\n")
+
+            dtr = detector.Detector(license_data, {'spans': True})
+            res = SlicResults()
+            for filename in files:
+                res.add_file(filename, dtr.get_license_info(filename))
+            assert_equal(len(res['MPL-2.0'][0]['spans']), 3)
+            assert_false('text' in res['MPL-2.0'][0])
+
+            # A file which has changed can't be used
+            with open(files[2], 'a') as f:
+                f.write("import sys\n")
+
+            missing = res.materialize("MPL",
+                                      detector.Detector(license_data,
+                                                        {'details': True}))
+            assert_equal(missing, [files[2]])
+
+            mpl = res['MPL-2.0']
+            assert_equal(len(mpl), 2)
+            found = [license for license in mpl if 'text' in license][0]
+            assert_equal(found['files'], files[:2])
+            assert_equal(found['copyrights'], set(["Copyright 2010 Fred",
+                                                   "Copyright 2011 Fred"]))
+            assert_equal(len(found['text']), 3)
+        finally:
+            shutil.rmtree(dir)
+
 if __name__ == '__main__':
     nose.main()
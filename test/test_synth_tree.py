@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import os
+import shutil
+import hashlib
+import tempfile
+
+from nose.tools import *
+
+import synth_tree
+
+def _contents(root):
+    # md5 of each file's content, by path
+    contents = {}
+    for (dirpath, dirnames, filenames) in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            with open(path, 'rb') as f:
+                contents[os.path.relpath(path, root)] = \
+                    hashlib.md5(f.read()).hexdigest()
+    return contents
+
+class TestSynthTree():
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def test_generate(self):
+        root = os.path.join(self.dir, "tree")
+        manifest = synth_tree.generate(root, 500, seed=1)
+
+        assert_equal(manifest['files'], 500)
+        assert_equal(sum(manifest['kinds'].values()), 500)
+        assert_true(manifest['kinds']['licensed'] > 300)
+        # Files, plus the manifest
+        assert_equal(len(_contents(root)), 501)
+        deep = [path for path in _contents(root) if "level29" in path]
+        assert_equal(len(deep), manifest['kinds']['deep'])
+
+    def test_deterministic(self):
+        first = os.path.join(self.dir, "first")
+        second = os.path.join(self.dir, "second")
+        synth_tree.generate(first, 200, seed=3)
+        synth_tree.generate(second, 200, seed=3)
+        assert_equal(_contents(first), _contents(second))
+
+        # A different seed gives a different tree, in place of the old one
+        synth_tree.generate(second, 200, seed=4)
+        assert_not_equal(_contents(first), _contents(second))
+        assert_equal(synth_tree.read_manifest(second)['seed'], 4)
+
+    def test_in_the_way(self):
+        with open(os.path.join(self.dir, "precious"), 'w') as f:
+            f.write("Not generated\n")
+
+        assert_raises(ValueError, synth_tree.generate, self.dir, 10)
+        assert_true(os.path.exists(os.path.join(self.dir, "precious")))
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import os
+import logging
+import shutil
+import tempfile
+
+from nose.tools import *
+
+import tracing
+
+class TestTracing():
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+        self.handler = tracing.AsyncFileHandler(os.path.join(self.dir,
+                                                             "test.%(pid)i.log"))
+        self.log = logging.getLogger("test_tracing")
+        self.log.propagate = False
+        self.log.setLevel(logging.DEBUG)
+        self.log.addHandler(self.handler)
+
+    def teardown(self):
+        self.log.removeHandler(self.handler)
+        self.handler.close()
+        shutil.rmtree(self.dir)
+
+    def read_log(self, pid=None):
+        filename = os.path.join(self.dir, "test.%i.log" % (pid or os.getpid()))
+        with open(filename) as logfile:
+            return logfile.read().splitlines()
+
+    def test_nothing_logged(self):
+        assert_equal(os.listdir(self.dir), [])
+
+    def test_write(self):
+        comment = ["first"]
+        self.log.warning("Comment: %r", comment)
+        # The message is made when it's logged
+        comment.append("second")
+        self.handler.add_line(u"DEBUG:test_tracing:é")
+        self.handler.flush()
+
+        assert_equal(self.read_log(),
+                     ["WARNING:test_tracing:Comment: ['first']",
+                      "DEBUG:test_tracing:\xc3\xa9"])
+
+    def test_fork(self):
+        self.log.warning("Parent")
+        self.handler.flush()
+
+        pid = os.fork()
+        if pid == 0:
+            # Children log separately, and what they log is written when
+            # they finish
+            try:
+                self.log.warning("Child")
+                self.handler.close()
+            finally:
+                os._exit(0)
+
+        os.waitpid(pid, 0)
+        self.log.warning("Parent again")
+        self.handler.flush()
+
+        assert_equal(self.read_log(), ["WARNING:test_tracing:Parent",
+                                       "WARNING:test_tracing:Parent again"])
+        assert_equal(self.read_log(pid), ["WARNING:test_tracing:Child"])
+
+    def test_set_level(self):
+        try:
+            tracing.set_level(logging.DEBUG)
+            assert_true(tracing.enabled)
+        finally:
+            tracing.set_level(logging.WARNING)
+
+        assert_false(tracing.enabled)
+
+if __name__ == '__main__':
+    nose.main()
@@ -47,3 +47,16 @@ class TestCollapse():
 
         result = utils.collapse("foo\t\nbar\r")
         assert_equal(result, "foo bar")
+
+class TestLRUCache():
+    def test_lru(self):
+        cache = utils.LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert_equal(cache.get("a"), 1)
+        # "b" is now the least recently used
+        cache.put("c", 3)
+        assert_equal(len(cache), 2)
+        assert_equal(cache.get("b"), None)
+        assert_equal(cache.get("c"), 3)
+        assert_equal((cache.hits, cache.misses), (2, 1))
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+###############################################################################
+import re
+import time
+
+from nose.tools import *
+
+import watchdog
+
+# Backtracks for (much) longer than any test should take
+_runaway_re = re.compile(r"^(a+)+$")
+
+def _work(item):
+    if item == "runaway":
+        _runaway_re.match("a" * 40 + "b")
+    if item == "error":
+        raise ValueError(item)
+    return item.upper()
+
+class TestWatchdog():
+    def setup(self):
+        self.pool = watchdog.WatchdogPool(2, 1)
+
+    def teardown(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def test_in_order(self):
+        items = ["item%i" % n for n in range(50)]
+        assert_equal(list(self.pool.imap(_work, items, 4)),
+                     [item.upper() for item in items])
+        assert_equal(self.pool.timeouts, 0)
+
+    def test_timeout(self):
+        # The items after the runaway one, in the same chunk, are still done
+        items = ["one", "runaway", "two", "three", "four"]
+        start = time.time()
+        results = list(self.pool.imap(_work, items, 3))
+
+        assert_less(time.time() - start, 10)
+        assert_equal(results[:1] + results[2:], ["ONE", "TWO", "THREE", "FOUR"])
+        assert_is_instance(results[1], watchdog.TimedOut)
+        assert_equal(results[1].item, "runaway")
+        assert_greater_equal(results[1].elapsed, 1)
+        assert_equal(self.pool.timeouts, 1)
+
+        # The replacement worker carries on
+        assert_equal(list(self.pool.imap(_work, ["five"])), ["FIVE"])
+
+    @raises(ValueError)
+    def test_error(self):
+        list(self.pool.imap(_work, ["one", "error"]))
+
+if __name__ == '__main__':
+    nose.main()
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Logging for slic. Every module logs to the "slic" logger, which get_logger()
+# sets up:
+#
+# * Each process writes its own log file, LOG_FILE with its process id filled
+#   in, so several slics running in the same directory (or the workers of one
+#   run) never write to the same file. A file is only created once there's
+#   something to write to it.
+# * Records are written by a background thread, in batches, so logging
+#   doesn't wait for the disk.
+#
+# Debug tracing in code which runs for every file or comment is done with
+#
+#   if tracing.enabled:
+#       tracing.trace("Format: %s", args)
+#
+# so that when it's off (the usual case) it costs one test, and no call and
+# no formatting of messages; and when it's on, it skips the logging module's
+# machinery for records. Use set_level() rather than setting the logger's
+# level directly, so that "enabled" is kept up to date.
+###############################################################################
+import os
+import threading
+import logging
+import collections
+
+# Where each process logs; %(pid)i is its process id
+LOG_FILE = "slic.%(pid)i.log"
+
+FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+# The writer wakes up when this many records are waiting, or after
+# WRITE_INTERVAL seconds, whichever is sooner
+BATCH_SIZE = 1000
+WRITE_INTERVAL = 0.5
+
+# If this many records are waiting, the writer isn't keeping up, so the
+# thread logging writes them itself
+MAX_QUEUED = 20000
+
+# Whether debug tracing is on
+enabled = False
+
+_logger = None
+_handler = None
+_lock = threading.Lock()
+
+def get_logger():
+    """Returns the "slic" logger, set up as described above"""
+    global _logger, _handler
+    with _lock:
+        if _logger is None:
+            _handler = AsyncFileHandler(LOG_FILE)
+            logger = logging.getLogger("slic")
+            logger.addHandler(_handler)
+            logger.propagate = False
+            _logger = logger
+
+    return _logger
+
+def trace(msg, *args):
+    """Log a debug message, as log.debug(msg, *args); only call this if
+    "enabled" is true.
+    """
+    if args:
+        try:
+            msg = msg % args
+        except UnicodeError:
+            # Undecodable bytes mixed with unicode
+            msg = "%s %r" % (msg, args)
+
+    _handler.add_line("DEBUG:slic:" + msg)
+
+def set_level(level):
+    """Log messages of "level" (e.g. logging.DEBUG) and above"""
+    global enabled
+    logger = get_logger()
+    logger.setLevel(level)
+    enabled = logger.isEnabledFor(logging.DEBUG)
+
+    if enabled:
+        # FORMAT uses none of the things the logging module finds out for
+        # every record by default, the slowest being the caller's source
+        # file and line
+        logging._srcfile = None
+        logging.logThreads = 0
+        logging.logProcesses = 0
+
+
+class AsyncFileHandler(logging.Handler):
+    """Writes records to a file for the current process, from a background
+    thread. "template" is the filename, with %(pid)i for the process id.
+    """
+    def __init__(self, template):
+        logging.Handler.__init__(self)
+        self.setFormatter(logging.Formatter(FORMAT))
+        self._template = template
+        self._pid = None
+
+    def filename(self):
+        """The file this process logs to"""
+        return self._template % {'pid': os.getpid()}
+
+    def _start(self):
+        # Called for the first record in each process. A forked child has
+        # its parent's records and locks, but not the thread which writes
+        # them, so starts afresh.
+        self._pid = os.getpid()
+        # LogRecords, or lines of text from trace(). Appending to and popping
+        # from a deque are atomic, so no lock is needed to add one.
+        self._records = collections.deque()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closing = False
+        self._logfile = None
+
+        self._writer = threading.Thread(target=self._write)
+        self._writer.daemon = True
+        self._writer.start()
+
+        # Pool workers leave by os._exit(), without the atexit handler which
+        # flushes the logs, but run multiprocessing's finalizers first
+        import multiprocessing.util
+        multiprocessing.util.Finalize(None, self.flush, exitpriority=0)
+
+    def emit(self, record):
+        try:
+            if self._pid != os.getpid():
+                self._start()
+
+            # Make the message now, as the arguments may change before the
+            # record is written
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = self.formatter.formatException(
+                                                            record.exc_info)
+                record.exc_info = None
+
+            self._add(record)
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            self.handleError(record)
+
+    def add_line(self, line):
+        """Log a line of text as it is"""
+        if self._pid != os.getpid():
+            self._start()
+
+        self._add(line)
+
+    def _add(self, record):
+        self._records.append(record)
+        queued = len(self._records)
+        if queued >= MAX_QUEUED or self._closing:
+            # The writer isn't keeping up, or has finished
+            self.flush()
+        elif queued == BATCH_SIZE:
+            self._wakeup.set()
+
+    def _write(self):
+        while not self._closing:
+            self._wakeup.wait(WRITE_INTERVAL)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything logged so far"""
+        if self._pid != os.getpid():
+            return
+
+        with self._write_lock:
+            lines = []
+            try:
+                while True:
+                    record = self._records.popleft()
+                    if not isinstance(record, basestring):
+                        record = self.format(record)
+                    if isinstance(record, unicode):
+                        record = record.encode('utf-8')
+                    lines.append(record + "\n")
+            except IndexError:
+                pass
+
+            if not lines:
+                return
+
+            try:
+                if self._logfile is None:
+                    self._logfile = open(self.filename(), 'a')
+                self._logfile.write("".join(lines))
+                self._logfile.flush()
+            except IOError:
+                # Nowhere to log to; carry on regardless
+                pass
+
+    def close(self):
+        # Called at exit. Stop the writer (so it isn't left running while
+        # the interpreter shuts down) and write what's left.
+        if self._pid == os.getpid() and not self._closing:
+            self._closing = True
+            self._wakeup.set()
+            self._writer.join()
+            self.flush()
+
+        logging.Handler.close(self)
@@ -6,10 +6,12 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 ###############################################################################
 import re
+import hashlib
+import collections
 
-import logging
-logging.basicConfig(filename="slic.log")
-log = logging.getLogger("slic")
+import tracing
+
+log = tracing.get_logger()
 
 # Bytes which can be a part of valid text chars in 4-byte UTF-8.
 # http://en.wikipedia.org/wiki/UTF-8#Codepage_layout
@@ -26,16 +28,59 @@ def is_binary(filename):
 
         with open(filename, 'rb') as binaryfile:
             data = binaryfile.read(1024)
-            if not data:
-                # 0-byte file. If a file is 0 bytes, can it truly be said to be
-                # binary or not binary? Deep. Still, we should ignore it.
-                return True
-            else:
-                return _is_binary_string(data)
+            return is_binary_data(data)
     except IOError:
         log.warning("Can't open file '%s' to see if it's binary", filename)
         return True
 
+# As is_binary, for when the start of the file has already been read
+def is_binary_data(data):
+    data = data[:1024]
+    if not data:
+        # 0-byte file. If a file is 0 bytes, can it truly be said to be
+        # binary or not binary? Deep. Still, we should ignore it.
+        return True
+    else:
+        return _is_binary_string(data)
+
 def collapse(line):
     # Collapse whitespace
     return re.sub("\s+", " ", line).strip()
+
+def text_hash(text):
+    # A short key for a (possibly long) piece of text
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+    return hashlib.md5(text).digest()
+
+
+class LRUCache(object):
+    """A mapping which holds at most "size" items, forgetting the least
+    recently used one when it's full. Counts hits and misses.
+    """
+    def __init__(self, size):
+        self._size = size
+        self._items = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        # Now the most recently used
+        self._items[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._items.pop(key, None)
+        self._items[key] = value
+        if len(self._items) > self._size:
+            self._items.popitem(last=False)
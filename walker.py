@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Walks a directory tree finding files to scan, applying the skip rules as
+# it goes. Files come out in the same order os.walk would produce them.
+# Binary files aren't weeded out here, as that needs the file to be read;
+# the Scanner does it when it reads the file for scanning.
+#
+# If the skip rules say so, .gitignore files found on the way are honoured
+# too, each applying to the directory it's in and everything below.
+#
+# Uses scandir, where available, as it gives us the type of each entry
+# without a separate stat() call. (It's in the os module from Python 3.5,
+# and is available as a separate module for earlier versions.)
+###############################################################################
+import os
+
+import tracing
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+log = tracing.get_logger()
+
+def _child(norm_root, name):
+    """The normalized path of "name" in the (normalized) dir "norm_root";
+    a cheap os.path.normpath(os.path.join(...)).
+    """
+    if norm_root == ".":
+        return name
+    if norm_root.endswith(os.sep):
+        return norm_root + name
+
+    return norm_root + os.sep + name
+
+def _list_dir(root):
+    """Returns ([dir names], [non-dir names], set(dir names which are links))
+    for the directory "root".
+    """
+    dirs, nondirs, links = [], [], set()
+
+    if scandir is not None:
+        for entry in scandir(root):
+            if entry.is_dir():
+                dirs.append(entry.name)
+                if entry.is_symlink():
+                    links.add(entry.name)
+            else:
+                nondirs.append(entry.name)
+    else:
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if os.path.isdir(path):
+                dirs.append(name)
+                if os.path.islink(path):
+                    links.add(name)
+            else:
+                nondirs.append(name)
+
+    return dirs, nondirs, links
+
+def _ignored(ignores, path, is_dir):
+    """Whether the .gitignore files in effect, a list of (dir, GitIgnore)
+    from outermost to innermost, say to ignore "path". The innermost file
+    with a matching rule decides.
+    """
+    for (base, ignore) in reversed(ignores):
+        if base == ".":
+            relpath = path
+        else:
+            relpath = path[len(base.rstrip(os.sep)) + 1:]
+
+        patterns = ignore.dirs if is_dir else ignore.files
+        ignored = patterns.match(relpath)
+        if ignored is not None:
+            if ignored:
+                log.debug("Skipping '%s' (according to %s).", path,
+                          os.path.join(base, ".gitignore"))
+            return ignored
+
+    return False
+
+def find_files(top, rules, ignores=[]):
+    """Generator which yields the path of each file in the tree under "top"
+    which shouldn't be skipped according to the SkipRules "rules". (The top
+    directory itself isn't checked.) Like os.walk, it doesn't follow symlinks
+    to directories, and silently ignores directories it can't read.
+
+    "ignores" is the list of .gitignore rules in effect from directories
+    above "top"; see _ignored().
+    """
+    try:
+        dirs, nondirs, links = _list_dir(top)
+    except OSError:
+        return
+
+    norm_root = os.path.normpath(top)
+    prefix = top if top.endswith(os.sep) else top + os.sep
+
+    if rules.gitignore and ".gitignore" in nondirs:
+        ignore = rules.read_gitignore(prefix + ".gitignore")
+        if ignore:
+            ignores = ignores + [(norm_root, ignore)]
+
+    for name in nondirs:
+        path = _child(norm_root, name)
+        if rules.skip_file(path, name):
+            continue
+        if ignores and _ignored(ignores, path, False):
+            continue
+
+        yield prefix + name
+
+    for name in dirs:
+        dirpath = _child(norm_root, name)
+        if name in links or rules.skip_dir(dirpath, name):
+            continue
+        if ignores and _ignored(ignores, dirpath, True):
+            continue
+
+        for path in find_files(prefix + name, rules, ignores):
+            yield path
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# A process pool with a time limit for each item it works on, for slic
+# --timeout. Some files (huge one-line comments, long runs of "*") make a
+# detection regexp backtrack for minutes, and nothing in the process doing the
+# matching can stop it: Python only handles signals between bytecodes, so an
+# alarm waits for the match to finish. Instead, the work is done in worker
+# processes and watched from outside; a worker which spends too long on one
+# item is killed and replaced, the item is given up on, and the rest of the
+# work carries on.
+#
+# Results are handed back in the order the items were supplied, as with
+# multiprocessing.Pool.imap. Workers are forked, so inherit what the main
+# process has set up already.
+###############################################################################
+import os
+import time
+import select
+import collections
+import multiprocessing
+
+import tracing
+
+log = tracing.get_logger()
+
+class TimedOut(object):
+    """Returned by WatchdogPool.imap() in place of the result for an item
+    which took too long; "elapsed" is how long it had run for, in seconds.
+    """
+    def __init__(self, item, elapsed):
+        self.item = item
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return "TimedOut(%r, %.1f)" % (self.item, self.elapsed)
+
+
+class WorkerDied(Exception):
+    """A worker process exited unexpectedly"""
+    pass
+
+
+def _work(conn, initializer, initargs):
+    # The worker loop: receives (func, items) and sends back, for each item
+    # in turn, (True, result) or (False, exception).
+    if initializer is not None:
+        initializer(*initargs)
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+
+        func, items = task
+        for item in items:
+            try:
+                result = (True, func(item))
+            except Exception, ex:
+                result = (False, ex)
+            conn.send(result)
+
+    conn.close()
+
+
+class _Worker(object):
+    def __init__(self, initializer, initargs):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_work,
+                                               args=(child_conn, initializer,
+                                                     initargs))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+
+        # (index, item) for each item sent and not yet finished, and when
+        # work on the first of them started
+        self.tasks = collections.deque()
+        self.started = None
+
+    def send(self, func, tasks):
+        self.tasks.extend(tasks)
+        self.started = time.time()
+        self.conn.send((func, [item for (index, item) in tasks]))
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+class WatchdogPool(object):
+    def __init__(self, processes, timeout, initializer=None, initargs=()):
+        """As multiprocessing.Pool, but any item which takes longer than
+        "timeout" seconds is given up on.
+        """
+        self._timeout = timeout
+        self._initializer = initializer
+        self._initargs = initargs
+        self._workers = [self._start() for n in range(processes)]
+        self.timeouts = 0
+
+    def _start(self):
+        return _Worker(self._initializer, self._initargs)
+
+    def imap(self, func, iterable, chunksize=1):
+        """As Pool.imap: returns the results of func(item) for each item in
+        "iterable", in order, except that items which took too long give a
+        TimedOut. Items are handed to the workers "chunksize" at a time.
+        """
+        items = enumerate(iterable)
+        # Items to be handed out again, because the worker which had them
+        # was killed before getting to them
+        retry = collections.deque()
+        # Results which are ready, by index, and the next one to hand back
+        done = {}
+        wanted = 0
+        exhausted = False
+
+        while True:
+            # Give work to any idle workers
+            for worker in self._workers:
+                if worker.tasks:
+                    continue
+
+                tasks = []
+                while len(tasks) < chunksize:
+                    if retry:
+                        tasks.append(retry.popleft())
+                    elif exhausted:
+                        break
+                    else:
+                        try:
+                            tasks.append(items.next())
+                        except StopIteration:
+                            exhausted = True
+
+                if not tasks:
+                    break
+                worker.send(func, tasks)
+
+            busy = [worker for worker in self._workers if worker.tasks]
+            if not busy:
+                break
+
+            # Wait for a result, or for the first deadline to pass
+            now = time.time()
+            wait = max(0, min(worker.started for worker in busy) +
+                          self._timeout - now)
+            ready, _, _ = select.select([worker.conn for worker in busy],
+                                        [], [], wait)
+
+            for worker in busy:
+                if worker.conn in ready:
+                    try:
+                        ok, result = worker.conn.recv()
+                    except EOFError:
+                        raise WorkerDied("Worker %i died working on %r" %
+                                         (worker.process.pid,
+                                          worker.tasks[0][1]))
+                    if not ok:
+                        raise result
+
+                    index, item = worker.tasks.popleft()
+                    done[index] = result
+                    worker.started = time.time()
+                    continue
+
+                elapsed = time.time() - worker.started
+                if elapsed < self._timeout:
+                    continue
+
+                # Stuck. Put it out of its misery, and start another.
+                index, item = worker.tasks.popleft()
+                log.warning("Gave up on %r after %.1f seconds", item, elapsed)
+                done[index] = TimedOut(item, elapsed)
+                self.timeouts += 1
+
+                retry.extendleft(reversed(worker.tasks))
+                worker.kill()
+                self._workers[self._workers.index(worker)] = self._start()
+
+            while wanted in done:
+                yield done.pop(wanted)
+                wanted += 1
+
+    def close(self):
+        """Tell the workers to exit once they've finished"""
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except IOError:
+                pass
+
+    def terminate(self):
+        """Stop the workers at once"""
+        for worker in self._workers:
+            worker.kill()
+
+    def join(self):
+        """Wait for the workers to exit"""
+        for worker in self._workers:
+            worker.process.join()
+            worker.conn.close()